@@ -0,0 +1,363 @@
+import os
+import sys
+import gc
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+# Run without a window so the suite works on headless machines
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+from templerun_claude import (Game, ParticleSystem, Autopilot, PLAYING, OBSTACLE_TYPES, COLLECTIBLE_TYPES,
+                              LANES, SCREEN_WIDTH, SCREEN_HEIGHT, MAX_PARTICLES, GOLD, RENDER_SCALES, QUALITY_NAMES,
+                              SIM_DT, AUTOPILOT_BUDGET_MS)
+from telemetry import Telemetry, EVENTS, EVENT_STATE, analyze, report
+
+# name: (obstacles, collectibles, particles)
+SCENARIOS = {
+    "light": (5, 5, 50),
+    "dense": (100, 100, 500),
+    "stress": (400, 400, 2000)
+}
+
+SUBSYSTEMS = ["update_game", "check_collisions", "draw_background", "draw_game", "draw_game_ui"]
+REGRESSION_THRESHOLD = 1.10  # Flag subsystems whose p50 got more than 10% slower
+
+class Scenario:
+    # Builds a Game held at a fixed entity count with magnet and invincibility active
+    def __init__(self, name, obstacles, collectibles, particles, seed=1234, render_scale=1.0, quality="high"):
+        self.name = name
+        self.obstacle_count = obstacles
+        self.collectible_count = collectibles
+        self.particle_count = particles
+        self.seed = seed
+        self.spawned = 0
+        
+        self.game = Game(seed=seed, leaderboard_path=None, render_scale=render_scale, quality=quality)
+        self.game.state = PLAYING
+        self.game.reset_game(seed)
+        self.game.particles = ParticleSystem(capacity=max(particles, MAX_PARTICLES))
+        self.refill()
+    
+    def spread_x(self):
+        # Entities join just past the right edge, spread over one screen width
+        return SCREEN_WIDTH + (self.spawned * 37) % SCREEN_WIDTH
+    
+    def refill(self):
+        game = self.game
+        
+        # No level spawning; the scenario controls the counts
+        game.level.next_distance = float("inf")
+        game.powerups["magnet"] = 10 ** 9
+        game.powerups["invincibility"] = 10 ** 9
+        game.player.invincible = True
+        game.player.invincible_timer = 10 ** 9
+        game.lives = 3
+        
+        while len(game.obstacles) < self.obstacle_count:
+            lane = self.spawned % len(LANES)
+            obstacle_type = OBSTACLE_TYPES[self.spawned % len(OBSTACLE_TYPES)]
+            direction = game.rng.choice([-1, 1]) if obstacle_type == "moving" else 0
+            game.obstacles.add(self.spread_x(), obstacle_type, lane, direction)
+            self.spawned += 1
+        
+        while len(game.collectibles) < self.collectible_count:
+            lane = self.spawned % len(LANES)
+            collectible_type = COLLECTIBLE_TYPES[self.spawned % len(COLLECTIBLE_TYPES)]
+            game.collectibles.add(self.spread_x(), collectible_type, lane, frame=game.frame)
+            self.spawned += 1
+        
+        missing = self.particle_count - len(game.particles)
+        if missing > 0:
+            game.particles.emit(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, GOLD, missing)
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def summarize(samples):
+    samples = sorted(samples)
+    mean = sum(samples) / len(samples)
+    return {
+        "fps": round(1.0 / mean, 1) if mean > 0 else None,
+        "mean_ms": round(mean * 1000, 4),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 4)
+    }
+
+def time_frames(scenario, frames):
+    game = scenario.game
+    timings = {name: [] for name in SUBSYSTEMS}
+    timings["frame"] = []
+    clock = time.perf_counter
+    
+    for _ in range(frames):
+        scenario.refill()
+        
+        start = clock()
+        game.update_game()
+        after_update = clock()
+        game.draw_game()
+        after_draw = clock()
+        
+        # Subsystems timed on their own, on top of the full update/draw
+        game.check_collisions()
+        after_collisions = clock()
+        game.draw_background()
+        after_background = clock()
+        game.ui.draw_game_ui(game.screen, game.score, game.coins, game.lives, game.game_speed, game.powerups)
+        after_ui = clock()
+        
+        timings["update_game"].append(after_update - start)
+        timings["draw_game"].append(after_draw - after_update)
+        timings["frame"].append(after_draw - start)
+        timings["check_collisions"].append(after_collisions - after_draw)
+        timings["draw_background"].append(after_background - after_collisions)
+        timings["draw_game_ui"].append(after_ui - after_background)
+    
+    return {name: summarize(samples) for name, samples in timings.items()}
+
+def measure_allocations(scenario, frames):
+    # Net block growth per frame catches leaks; the tracemalloc peak shows how
+    # much short-lived memory a frame churns through
+    game = scenario.game
+    scenario.refill()
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(frames):
+        game.update_game()
+        game.draw_game()
+    blocks_after = sys.getallocatedblocks()
+    
+    tracemalloc.start()
+    peaks = []
+    for _ in range(frames):
+        scenario.refill()
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        game.update_game()
+        game.draw_game()
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - current)
+    tracemalloc.stop()
+    
+    return {
+        "net_blocks_per_frame": round((blocks_after - blocks_before) / frames, 2),
+        "peak_alloc_bytes_per_frame": int(sum(peaks) / len(peaks))
+    }
+
+def run_scenario(name, frames, warmup, render_scale=1.0, quality="high"):
+    obstacles, collectibles, particles = SCENARIOS[name]
+    scenario = Scenario(name, obstacles, collectibles, particles, render_scale=render_scale, quality=quality)
+    
+    # Warm the sprite and text caches before measuring
+    for _ in range(warmup):
+        scenario.refill()
+        scenario.game.update_game()
+        scenario.game.draw_game()
+    
+    result = {
+        "obstacles": obstacles,
+        "collectibles": collectibles,
+        "particles": particles,
+        "frames": frames,
+        "timings": time_frames(scenario, frames),
+        "allocations": measure_allocations(scenario, min(frames, 200)),
+        "entities": scenario.game.entity_stats()
+    }
+    return result
+
+def run_autopilot(frames, budget_ms, seed=1234):
+    # Headless runs played by the autopilot. Each frame is its search plus
+    # the real step, which has to fit in one simulation step of real time;
+    # the search rates measure clone and step cost in the simulation core.
+    game = Game(headless=True, seed=seed)
+    pilot = Autopilot(budget_ms, history=frames)
+    frame_times = []
+    runs = 1
+    clock = time.perf_counter
+    for _ in range(frames):
+        start = clock()
+        if not game.step(pilot(game, game.frame)):
+            runs += 1
+            game.start_run(seed + runs)
+        frame_times.append(clock() - start)
+    
+    snapshot = game.save_state()
+    start = clock()
+    for _ in range(1000):
+        game.load_state(game.save_state())
+    clone_time = (clock() - start) / 1000
+    game.load_state(snapshot)
+    
+    search = max(sum(pilot.think_times), 1e-9)
+    return {
+        "frames": frames,
+        "runs": runs,
+        "timings": summarize(frame_times),
+        "autopilot": pilot.summary(),
+        "nodes_per_s": round(pilot.nodes / search),
+        "steps_per_s": round(pilot.steps / search),
+        "clone_us": round(clone_time * 1e6, 2)
+    }
+
+def run_telemetry(records, rotate_bytes=16 * 1024 * 1024):
+    # Cost of one log() call on the game thread with the writer running, and
+    # how fast the analyzer aggregates the files it wrote (rotated every
+    # rotate_bytes) through memory maps
+    rng = random.Random(1234)
+    events = []
+    for _ in range(4096):
+        event = rng.randrange(len(EVENTS))
+        value = rng.randrange(4) if event == EVENT_STATE else rng.randrange(100)  # States are 0-3
+        events.append((event, rng.randrange(4), rng.randrange(3), rng.randrange(4), rng.uniform(0, 20000),
+                       value, rng.randrange(10000)))
+    directory = tempfile.mkdtemp(prefix="telemetry_")
+    clock = time.perf_counter
+    try:
+        log = Telemetry(directory, rotate_bytes=rotate_bytes)
+        start = clock()
+        for frame in range(records):
+            event, subject, lane, lives, distance, value, score = events[frame & 4095]
+            log.log(event, frame, subject, lane, lives, distance, value, score)
+        log_time = clock() - start
+        log.close(timeout=60)
+        
+        start = clock()
+        summary = report(analyze([directory]))
+        analyze_time = clock() - start
+    finally:
+        shutil.rmtree(directory)
+    
+    stats = log.stats()
+    return {
+        "records": records,
+        "written": stats["records"],
+        "dropped": stats["dropped"],
+        "files": stats["files"],
+        "log_ns": round(log_time / records * 1e9, 1),
+        "analyzed": summary["records"],
+        "analyze_s": round(analyze_time, 4),
+        "analyze_records_per_s": round(summary["records"] / max(analyze_time, 1e-9))
+    }
+
+def compare(results, baseline):
+    # Returns a list of (scenario, subsystem, ratio) for p50 regressions
+    regressions = []
+    for name, result in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for subsystem, stats in result["timings"].items():
+            base_stats = base["timings"].get(subsystem)
+            if not base_stats or not base_stats["p50_ms"]:
+                continue
+            ratio = stats["p50_ms"] / base_stats["p50_ms"]
+            if ratio > REGRESSION_THRESHOLD:
+                regressions.append((name, subsystem, ratio))
+    return regressions
+
+def print_results(results):
+    for name, result in results["scenarios"].items():
+        print("%s: %d obstacles, %d collectibles, %d particles over %d frames" % (
+            name, result["obstacles"], result["collectibles"], result["particles"], result["frames"]))
+        for subsystem, stats in result["timings"].items():
+            print("  %-18s %9.1f fps  p50 %8.3f ms  p99 %8.3f ms" % (
+                subsystem, stats["fps"] or 0, stats["p50_ms"], stats["p99_ms"]))
+        allocations = result["allocations"]
+        print("  allocations: %.2f net blocks/frame, %d peak bytes/frame" % (
+            allocations["net_blocks_per_frame"], allocations["peak_alloc_bytes_per_frame"]))
+        for kind, stats in result["entities"].items():
+            if "high_water" in stats:
+                print("  %s store: high water %d, capacity %d" % (kind, stats["high_water"], stats["capacity"]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game loop in scripted stress scenarios")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=60)
+    parser.add_argument("--render-scale", type=float, choices=RENDER_SCALES, default=1.0,
+                        help="internal world resolution as a fraction of the window")
+    parser.add_argument("--quality", choices=QUALITY_NAMES, default="high",
+                        help="fixed detail level to measure")
+    parser.add_argument("--autopilot", type=int, metavar="FRAMES",
+                        help="play FRAMES frames with the autopilot and check it keeps up in real time, then exit")
+    parser.add_argument("--autopilot-budget", type=float, default=AUTOPILOT_BUDGET_MS, metavar="MS")
+    parser.add_argument("--telemetry", type=int, metavar="RECORDS",
+                        help="log RECORDS telemetry events, time logging and analyzing them, then exit")
+    parser.add_argument("--save", metavar="FILE", help="write results to a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a saved baseline")
+    args = parser.parse_args()
+    
+    if args.autopilot:
+        result = run_autopilot(args.autopilot, args.autopilot_budget)
+        stats = result["timings"]
+        print("autopilot: %d frames, %d runs, frame p50 %.3f ms, p99 %.3f ms" % (
+            result["frames"], result["runs"], stats["p50_ms"], stats["p99_ms"]))
+        print("  %s" % json.dumps(result["autopilot"]))
+        print("  search: %d nodes/s, %d steps/s; save+load %.1f us" % (
+            result["nodes_per_s"], result["steps_per_s"], result["clone_us"]))
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump(result, f, indent=2)
+        if stats["p99_ms"] > SIM_DT * 1000:
+            print("AUTOPILOT: slower than real time")
+            sys.exit(1)
+        return
+    
+    if args.telemetry:
+        result = run_telemetry(args.telemetry)
+        print("telemetry: %d records, %.0f ns per log call, %d dropped, %d files" % (
+            result["records"], result["log_ns"], result["dropped"], result["files"]))
+        print("  analyzed %d records in %.3f s (%.1fM records/s)" % (
+            result["analyzed"], result["analyze_s"], result["analyze_records_per_s"] / 1e6))
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump(result, f, indent=2)
+        if result["analyzed"] != result["written"]:
+            print("TELEMETRY: the analyzer saw %d of %d written records" % (result["analyzed"], result["written"]))
+            sys.exit(1)
+        return
+    
+    pygame.display.init()
+    pygame.font.init()
+    
+    results = {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "video_driver": pygame.display.get_driver(),
+        "render_scale": args.render_scale,
+        "quality": args.quality,
+        "scenarios": {}
+    }
+    for name in args.scenario or list(SCENARIOS):
+        results["scenarios"][name] = run_scenario(name, args.frames, args.warmup, args.render_scale, args.quality)
+    
+    print_results(results)
+    
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline)
+        for name, subsystem, ratio in regressions:
+            print("REGRESSION %s/%s: p50 %.0f%% of baseline" % (name, subsystem, ratio * 100))
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
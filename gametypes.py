@@ -0,0 +1,14 @@
+# Type tables shared by the game and everything that stores or reads its
+# ids: snapshots, telemetry logs, sweep results and vec_env observations all
+# hold positions in these lists. Only ever append to them; reordering or
+# removing an entry changes what existing files mean.
+OBSTACLE_TYPES = ["barrier", "low", "pit", "moving"]
+COLLECTIBLE_TYPES = ["coin", "gem", "magnet", "speed", "invincibility"]
+POWERUPS = ["magnet", "speed", "invincibility", "double_coins"]
+
+# Game states
+MENU = 0
+PLAYING = 1
+GAME_OVER = 2
+PAUSED = 3
+STATE_NAMES = ["menu", "playing", "game_over", "paused"]
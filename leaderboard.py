@@ -0,0 +1,156 @@
+import sys
+import json
+import time
+import queue
+import sqlite3
+import argparse
+import threading
+
+LEADERBOARD_PATH = "leaderboard.db"
+LEGACY_HIGH_SCORE_PATH = "high_score.json"
+SCHEMA_VERSION = 1
+TOP_SIZE = 10
+BATCH_WINDOW = 0.25  # Seconds the writer waits for more runs before committing
+BUSY_TIMEOUT = 5.0  # Seconds to wait on another process holding the write lock
+
+COLUMNS = ["score", "distance", "coins", "seed", "frames", "duration", "created"]
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY,
+        score INTEGER NOT NULL,
+        distance REAL,
+        coins INTEGER,
+        seed INTEGER,
+        frames INTEGER,
+        duration REAL,
+        created REAL NOT NULL
+    )""",
+    # Top-N queries walk this index instead of sorting the table
+    "CREATE INDEX IF NOT EXISTS runs_by_score ON runs (score DESC)"
+]
+
+def connect(path):
+    # WAL lets readers on other cabinets keep going while one writes, and the
+    # busy timeout makes concurrent writers queue up instead of failing
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def migrate(conn, legacy_path=LEGACY_HIGH_SCORE_PATH):
+    # Create the schema and import the old single high score, once per database.
+    # The write lock is taken up front so cabinets starting together migrate once.
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        for statement in SCHEMA:
+            conn.execute(statement)
+        legacy = 0
+        try:
+            with open(legacy_path) as f:
+                legacy = int(json.load(f).get("high_score", 0))
+        except (OSError, ValueError, AttributeError):
+            pass
+        if legacy > 0 and conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 0:
+            conn.execute("INSERT INTO runs (score, created) VALUES (?, ?)", (legacy, time.time()))
+        conn.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+
+def query_top(conn, limit=TOP_SIZE):
+    rows = conn.execute("SELECT %s FROM runs ORDER BY score DESC LIMIT ?" % ", ".join(COLUMNS), (limit,))
+    return [dict(zip(COLUMNS, row)) for row in rows]
+
+class Leaderboard:
+    # Persistent table of finished runs. All database access happens on a
+    # writer thread: submit() only queues the run, and the best score and top
+    # runs are cached in memory for the game to read at any time.
+    def __init__(self, path=LEADERBOARD_PATH, legacy_path=LEGACY_HIGH_SCORE_PATH, top_size=TOP_SIZE):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.top_size = top_size
+        self.high_score = 0
+        self.top = []
+        self.loaded = threading.Event()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="leaderboard", daemon=True)
+        self.thread.start()
+    
+    def submit(self, score, distance, coins, seed, frames, duration):
+        if score > self.high_score:
+            self.high_score = score
+        self.queue.put((score, distance, coins, seed, frames, duration, time.time()))
+    
+    def close(self, timeout=BUSY_TIMEOUT):
+        # Flush queued runs and stop the writer
+        self.queue.put(None)
+        self.thread.join(timeout)
+    
+    def report(self, message, error):
+        sys.stderr.write("Leaderboard %s: %s\n" % (message, error))
+    
+    def refresh(self, conn):
+        top = query_top(conn, self.top_size)
+        self.top = top
+        if top and top[0]["score"] > self.high_score:
+            self.high_score = top[0]["score"]
+    
+    def run(self):
+        conn = None
+        try:
+            conn = connect(self.path)
+            migrate(conn, self.legacy_path)
+            self.refresh(conn)
+        except sqlite3.Error as error:
+            self.report("unavailable, runs will not be saved", error)
+        finally:
+            self.loaded.set()
+        
+        stopping = False
+        while not stopping:
+            # Block for the first run, then gather whatever else arrives within
+            # the batch window into the same transaction
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + BATCH_WINDOW
+            while batch[-1] is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                stopping = True
+                batch.pop()
+            
+            if batch and conn:
+                try:
+                    with conn:
+                        conn.executemany("INSERT INTO runs (%s) VALUES (?, ?, ?, ?, ?, ?, ?)" % ", ".join(COLUMNS), batch)
+                    self.refresh(conn)
+                except sqlite3.Error as error:
+                    self.report("could not save %d runs" % len(batch), error)
+        
+        if conn:
+            conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the best runs from the leaderboard")
+    parser.add_argument("--top", type=int, default=TOP_SIZE)
+    parser.add_argument("--db", default=LEADERBOARD_PATH)
+    args = parser.parse_args()
+    
+    conn = connect(args.db)
+    migrate(conn)
+    for rank, run in enumerate(query_top(conn, args.top), 1):
+        print("%2d. %6d  distance %8s  coins %5s  seed %s  %s" % (
+            rank, run["score"], "-" if run["distance"] is None else "%.0f" % run["distance"],
+            "-" if run["coins"] is None else run["coins"], "-" if run["seed"] is None else run["seed"],
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(run["created"]))))
+    conn.close()
+
+if __name__ == "__main__":
+    main()
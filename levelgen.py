@@ -0,0 +1,241 @@
+import queue
+import random
+import threading
+
+# Spawn records handed to the game: (track distance, kind, lane, type, direction).
+# direction is only used by moving obstacles and is 0 for everything else.
+OBSTACLE = 0
+COLLECTIBLE = 1
+
+# Collectible slots of type "item" roll the game's rarity table when the chunk
+# is built, so one template covers coins, gems and power-ups alike.
+ITEM = "item"
+
+# Segment templates. Offsets are track distance from the start of the segment:
+# an entity enters at the right edge of the screen once the player has covered
+# that distance. Lanes do not place entities; they only order simultaneous
+# obstacle hits in check_collisions (by lane, then x).
+SEGMENT_TEMPLATES = {
+    "barrier": {
+        "length": 560, "weight": 3,
+        "spawns": [(0, OBSTACLE, 1, "barrier"), (360, COLLECTIBLE, 0, "coin"),
+                   (420, COLLECTIBLE, 0, "coin"), (480, COLLECTIBLE, 0, "coin")]
+    },
+    "low": {
+        "length": 400, "weight": 3,
+        "spawns": [(0, OBSTACLE, 2, "low"), (100, COLLECTIBLE, 1, "coin"), (160, COLLECTIBLE, 1, "coin")]
+    },
+    "pit": {
+        "length": 480, "weight": 2,
+        "spawns": [(0, OBSTACLE, 1, "pit"), (30, COLLECTIBLE, 1, "gem")]
+    },
+    "moving": {
+        "length": 500, "weight": 2,
+        "spawns": [(0, OBSTACLE, 1, "moving"), (200, COLLECTIBLE, 2, ITEM)]
+    },
+    "hurdles": {
+        "length": 800, "weight": 1,
+        "spawns": [(0, OBSTACLE, 0, "barrier"), (300, COLLECTIBLE, 1, "coin"),
+                   (360, COLLECTIBLE, 1, "coin"), (600, OBSTACLE, 2, "barrier")]
+    },
+    "double": {
+        "length": 700, "weight": 2,
+        "spawns": [(0, OBSTACLE, 1, "barrier"), (260, COLLECTIBLE, 1, "coin"),
+                   (320, COLLECTIBLE, 1, "coin"), (520, OBSTACLE, 1, "low")]
+    },
+    "slalom": {
+        "length": 1000, "weight": 2,
+        "spawns": [(0, OBSTACLE, 0, "barrier"), (200, COLLECTIBLE, 1, "coin"), (260, COLLECTIBLE, 1, "coin"),
+                   (320, COLLECTIBLE, 1, "coin"), (600, OBSTACLE, 2, "low"), (800, COLLECTIBLE, 0, ITEM)]
+    },
+    "coin_run": {
+        "length": 480, "weight": 2,
+        "spawns": [(offset, COLLECTIBLE, lane, "coin") for offset, lane in zip(range(0, 360, 60), [0, 0, 1, 1, 2, 2])]
+    },
+    "items": {
+        "length": 300, "weight": 1,
+        "spawns": [(0, COLLECTIBLE, 0, ITEM), (120, COLLECTIBLE, 2, ITEM)]
+    }
+}
+
+SEGMENTS_PER_CHUNK = 4
+LOOKAHEAD_CHUNKS = 4  # Chunks a worker thread keeps ready ahead of the player
+
+def obstacle_windows(spawns, extents):
+    # Track span each obstacle occupies as it passes the player, sorted;
+    # extents maps an obstacle type to its (front, back) offsets, which cover
+    # its width and, for moving obstacles, how far they can drift
+    windows = []
+    for offset, kind, lane, entity_type in spawns:
+        if kind == OBSTACLE:
+            front, back = extents[entity_type]
+            windows.append((offset + front, offset + back))
+    windows.sort()
+    return windows
+
+def validate_template(name, template, min_gap, extents):
+    # A template is passable if every obstacle is followed by at least min_gap
+    # of clear track: enough to land a jump or finish a slide before the next
+    for offset, kind, lane, entity_type in template["spawns"]:
+        if not 0 <= offset < template["length"]:
+            raise ValueError("Segment %r spawns outside its length" % name)
+    windows = obstacle_windows(template["spawns"], extents)
+    for (start, end), (next_start, next_end) in zip(windows, windows[1:]):
+        if next_start - end < min_gap:
+            raise ValueError("Segment %r has obstacles %.0f apart (needs %.0f)" % (name, next_start - end, min_gap))
+
+def build_library(min_gap, extents, templates=SEGMENT_TEMPLATES):
+    # Validate every segment once, up front. Each entry is
+    # (name, length, head, tail, spawns) where head/tail bound the obstacle
+    # windows (None for obstacle-free segments).
+    library = []
+    weights = []
+    for name, template in templates.items():
+        validate_template(name, template, min_gap, extents)
+        windows = obstacle_windows(template["spawns"], extents)
+        head = windows[0][0] if windows else None
+        tail = max(end for _, end in windows) if windows else None
+        library.append((name, template["length"], head, tail, sorted(template["spawns"])))
+        weights.append(template["weight"])
+    return library, weights
+
+def roll_rarity(rng, rarity):
+    # rarity is a list of (cumulative threshold, type) pairs ending at 1.0
+    rand = rng.random()
+    for threshold, kind in rarity:
+        if rand < threshold:
+            return kind
+    return rarity[-1][1]
+
+class LevelStream:
+    # Builds the track ahead of the player from validated segments, a chunk of
+    # SEGMENTS_PER_CHUNK at a time. Generation depends only on the seed, so a
+    # threaded stream produces exactly the same level as an inline one.
+    # Segments are validated for design_speed; a chunk the game asks for at a
+    # higher speed is stretched along the track by speed / design_speed, which
+    # keeps every gap as many frames long as it was validated for. Stretching
+    # happens in next_chunk, on the consumer's side, so it never depends on
+    # how far ahead a worker thread got.
+    def __init__(self, library, seed, min_gap, segment_gap, rarity, threaded=False, design_speed=None, speed=0.0):
+        self.segments, self.weights = library
+        self.rng = random.Random(seed)
+        self.min_gap = min_gap
+        self.design_speed = design_speed
+        self.segment_gap = segment_gap
+        self.rarity = rarity
+        
+        # Generator state, only touched by whichever thread builds chunks
+        self.cursor = 0.0  # Track distance where the last segment ended
+        self.last_tail = None  # End of the last obstacle's arrival window
+        
+        # Consumer state. resume is the generator state right after chunk was
+        # built, (rng state, cursor, last_tail), which is where a restored
+        # stream picks up once the rest of chunk has been spawned, plus the
+        # track distance that cursor was stretched to.
+        self.chunk = None
+        self.resume = (None, 0.0, None, 0.0)
+        self.index = 0
+        self.next_distance = 0.0
+        self.ready = []
+        self.stalls = 0
+        
+        self.queue = None
+        self.thread = None
+        self.stopped = threading.Event()
+        if threaded:
+            self.start()
+        self.next_chunk(speed)
+    
+    def start(self):
+        self.queue = queue.Queue(maxsize=LOOKAHEAD_CHUNKS)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.worker, name="level-stream", daemon=True)
+        self.thread.start()
+    
+    def generate_chunk(self):
+        rng = self.rng
+        chunk = []
+        for name, length, head, tail, spawns in rng.choices(self.segments, self.weights, k=SEGMENTS_PER_CHUNK):
+            start = self.cursor + rng.randint(*self.segment_gap)
+            if head is not None and self.last_tail is not None:
+                # Keep the gap to the previous segment's last obstacle
+                start = max(start, self.last_tail + self.min_gap - head)
+            
+            for offset, kind, lane, entity_type in spawns:
+                direction = 0
+                if entity_type == ITEM:
+                    entity_type = roll_rarity(rng, self.rarity)
+                elif entity_type == "moving":
+                    direction = rng.choice([-1, 1])
+                chunk.append((start + offset, kind, lane, entity_type, direction))
+            
+            self.cursor = start + length
+            if tail is not None:
+                self.last_tail = start + tail
+        return chunk, (rng.getstate(), self.cursor, self.last_tail)
+    
+    def worker(self):
+        while not self.stopped.is_set():
+            chunk = self.generate_chunk()
+            while not self.stopped.is_set():
+                try:
+                    self.queue.put(chunk, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+    
+    def next_chunk(self, speed=0.0):
+        if self.queue is None:
+            chunk, resume = self.generate_chunk()
+        else:
+            if self.queue.empty():
+                self.stalls += 1
+            chunk, resume = self.queue.get()
+        
+        # Pick up where the previous chunk ended on both scales
+        _, start, _, origin = self.resume
+        scale = max(1.0, speed / self.design_speed) if self.design_speed else 1.0
+        if scale != 1.0 or origin != start:
+            chunk = [(origin + (distance - start) * scale, kind, lane, entity_type, direction)
+                     for distance, kind, lane, entity_type, direction in chunk]
+        self.chunk = chunk
+        self.resume = resume + (origin + (resume[1] - start) * scale,)
+        self.index = 0
+        self.next_distance = self.chunk[0][0]
+    
+    def due(self, distance, speed=0.0):
+        # Spawn records whose track distance has been reached, in order; the
+        # returned list is reused by the next call. speed is the fastest the
+        # game expects to run through a chunk started now.
+        ready = self.ready
+        ready.clear()
+        while self.next_distance <= distance:
+            ready.append(self.chunk[self.index])
+            self.index += 1
+            if self.index == len(self.chunk):
+                self.next_chunk(speed)
+            else:
+                self.next_distance = self.chunk[self.index][0]
+        return ready
+    
+    def restore(self, chunk, resume, index=0):
+        # Continue with the spawn records in chunk from index on, then whatever
+        # the generator builds from resume; a worker thread restarts from there
+        threaded = self.thread is not None
+        if threaded or resume is not self.resume:
+            # An inline stream that built nothing since is already there
+            self.close()
+            rng_state, self.cursor, self.last_tail, _ = resume
+            self.rng.setstate(rng_state)
+            self.resume = resume
+        self.chunk = chunk
+        self.index = index
+        self.next_distance = chunk[index][0]
+        if threaded:
+            self.start()
+    
+    def close(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
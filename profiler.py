@@ -0,0 +1,194 @@
+import json
+import time
+from collections import deque
+
+import pygame
+
+# Phases of one frame in the order they run. Each mark(phase) charges the time
+# since the previous mark to that phase; fixed-timestep catch-up frames simply
+# accumulate several simulation steps into the same phases.
+PHASES = [
+    "events", "player", "spawning", "entities", "magnet", "particles",
+    "powerups", "collisions", "background", "draw_entities", "present_world", "hud", "overlay", "flip"
+]
+
+PHASE_COLORS = {
+    "events": (200, 200, 200),
+    "player": (80, 160, 255),
+    "spawning": (120, 220, 120),
+    "entities": (60, 180, 60),
+    "magnet": (255, 80, 80),
+    "particles": (255, 160, 60),
+    "powerups": (220, 220, 60),
+    "collisions": (255, 60, 200),
+    "background": (100, 100, 180),
+    "draw_entities": (160, 100, 255),
+    "present_world": (180, 140, 220),
+    "hud": (255, 255, 255),
+    "overlay": (120, 120, 120),
+    "flip": (60, 220, 220)
+}
+
+MAX_TRACE_EVENTS = 2000000  # Cap memory for very long recordings
+
+class FrameProfiler:
+    def __init__(self, history=240):
+        self.enabled = False
+        self.overlay_visible = False
+        self.clock = time.perf_counter
+        self.history = history
+        self.frame_times = deque(maxlen=history)
+        self.phase_history = {phase: deque(maxlen=history) for phase in PHASES}
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.frame_start = 0.0
+        self.last_mark = 0.0
+        self.frame_index = 0
+        
+        # Current settings worth showing next to the timings, e.g. the quality level
+        self.labels = {}
+        
+        # Chrome trace recording
+        self.recording = False
+        self.trace_events = []
+        self.trace_origin = 0.0
+        
+        # Overlay text is refreshed a few times a second, not every frame
+        self.overlay_lines = []
+        self.overlay_refresh = 15
+        self.overlay_surface = None
+        self.graph_surface = None
+    
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+        self.enabled = self.overlay_visible or self.recording
+    
+    def start_recording(self):
+        self.recording = True
+        self.enabled = True
+        self.trace_events = []
+        self.trace_origin = self.clock()
+    
+    def stop_recording(self):
+        self.recording = False
+        self.enabled = self.overlay_visible
+    
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = self.clock()
+        self.frame_start = now
+        self.last_mark = now
+        current = self.current
+        for phase in current:
+            current[phase] = 0.0
+    
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = self.clock()
+        elapsed = now - self.last_mark
+        self.current[phase] += elapsed
+        if self.recording and len(self.trace_events) < MAX_TRACE_EVENTS:
+            self.trace_events.append((phase, self.last_mark, elapsed))
+        self.last_mark = now
+    
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = self.clock()
+        frame_time = now - self.frame_start
+        self.frame_times.append(frame_time)
+        for phase, elapsed in self.current.items():
+            self.phase_history[phase].append(elapsed)
+        if self.recording and len(self.trace_events) < MAX_TRACE_EVENTS:
+            self.trace_events.append(("frame", self.frame_start, frame_time))
+        self.frame_index += 1
+    
+    def summary(self):
+        # Mean and worst time per phase over the rolling history, in ms
+        result = {}
+        for phase, samples in self.phase_history.items():
+            if samples:
+                result[phase] = {
+                    "mean_ms": round(sum(samples) / len(samples) * 1000, 4),
+                    "max_ms": round(max(samples) * 1000, 4)
+                }
+        if self.frame_times:
+            result["frame"] = {
+                "mean_ms": round(sum(self.frame_times) / len(self.frame_times) * 1000, 4),
+                "max_ms": round(max(self.frame_times) * 1000, 4)
+            }
+        return result
+    
+    def export_chrome_trace(self, path):
+        # Loadable in chrome://tracing or Perfetto; frames and phases are
+        # complete ("X") events on separate rows
+        events = []
+        origin = self.trace_origin
+        for name, start, duration in self.trace_events:
+            events.append({
+                "name": name,
+                "cat": "frame" if name == "frame" else "phase",
+                "ph": "X",
+                "ts": round((start - origin) * 1e6, 3),
+                "dur": round(duration * 1e6, 3),
+                "pid": 0,
+                "tid": 0 if name == "frame" else 1
+            })
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"summary": self.summary(), "labels": self.labels}}, f)
+    
+    def export_json(self, path):
+        with open(path, "w") as f:
+            json.dump({"frames": self.frame_index, "summary": self.summary(), "labels": self.labels}, f, indent=2)
+    
+    def draw_overlay(self, screen, font, text_cache, origin=(820, 220), size=(360, 360)):
+        # Rolling frame-time graph with a per-phase breakdown; returns the panel rect
+        x, y = origin
+        width, height = size
+        graph_height = 100
+        if self.overlay_surface is None or self.overlay_surface.get_size() != size:
+            self.overlay_surface = pygame.Surface(size)
+            self.overlay_surface.set_alpha(200)
+            self.graph_surface = pygame.Surface((width, graph_height))
+            self.graph_surface.fill((0, 0, 0))
+        panel = self.overlay_surface
+        panel.fill((0, 0, 0))
+        
+        # Graph: scroll one column left and stack the newest frame's phases
+        # (33 ms full scale) in the freed column on the right
+        graph = self.graph_surface
+        column = max(width // max(self.history, 1), 1)
+        graph.scroll(-column, 0)
+        graph.fill((0, 0, 0), (width - column, 0, column, graph_height))
+        if self.frame_times:
+            scale = graph_height / 0.033
+            bottom = graph_height
+            column_x = width - column
+            for phase in PHASES:
+                bar = int(self.phase_history[phase][-1] * scale)
+                if bar:
+                    graph.fill(PHASE_COLORS[phase], (column_x, bottom - bar, column, bar))
+                    bottom -= bar
+        panel.blit(graph, (0, 0))
+        target = graph_height - int(graph_height / 0.033 / 60)
+        pygame.draw.line(panel, (255, 0, 0), (0, target), (width, target), 1)
+        
+        if self.frame_index % self.overlay_refresh == 0 or not self.overlay_lines:
+            summary = self.summary()
+            frame = summary.get("frame", {"mean_ms": 0.0, "max_ms": 0.0})
+            self.overlay_lines = [("frame %.2f ms (max %.2f)" % (frame["mean_ms"], frame["max_ms"]), (255, 255, 255))]
+            if self.labels:
+                self.overlay_lines.append(("  ".join("%s %s" % item for item in self.labels.items()), (255, 255, 255)))
+            for phase in PHASES:
+                stats = summary.get(phase)
+                if stats:
+                    self.overlay_lines.append(("%-13s %.3f ms" % (phase, stats["mean_ms"]), PHASE_COLORS[phase]))
+        
+        line_y = graph_height + 6
+        for text, color in self.overlay_lines:
+            panel.blit(text_cache.render(font, text, color), (6, line_y))
+            line_y += font.get_linesize()
+        
+        return screen.blit(panel, (x, y))
@@ -0,0 +1,97 @@
+import os
+
+# Replay file layout (all integers are unsigned LEB128 varints):
+#   MAGIC, seed, frame count, event count, then one varint per event holding
+#   (frames since the previous event << ACTION_BITS) | action code
+# A typical run presses a key about once a second, which costs 1-2 bytes.
+# The version in MAGIC changes whenever seeded level generation does, since
+# older replays would no longer reproduce their run.
+MAGIC = b"TRR3"
+ACTION_BITS = 2
+ACTION_MASK = (1 << ACTION_BITS) - 1
+
+def write_varint(out, value):
+    if value < 0:
+        raise ValueError("Varints cannot hold negative values, got %d" % value)
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+def read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated replay data")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+class Replay:
+    def __init__(self, seed, frames=0, events=None):
+        self.seed = seed
+        self.frames = frames
+        self.events = events if events is not None else []  # (frame, action code) pairs
+    
+    def to_bytes(self):
+        out = bytearray(MAGIC)
+        write_varint(out, self.seed)
+        write_varint(out, self.frames)
+        write_varint(out, len(self.events))
+        last_frame = 0
+        for frame, code in self.events:
+            write_varint(out, ((frame - last_frame) << ACTION_BITS) | code)
+            last_frame = frame
+        return bytes(out)
+    
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a replay file")
+        pos = len(MAGIC)
+        seed, pos = read_varint(data, pos)
+        frames, pos = read_varint(data, pos)
+        count, pos = read_varint(data, pos)
+        events = []
+        frame = 0
+        for _ in range(count):
+            value, pos = read_varint(data, pos)
+            frame += value >> ACTION_BITS
+            events.append((frame, value & ACTION_MASK))
+        return cls(seed, frames, events)
+    
+    def save(self, path):
+        # Encoded first, so a replay that cannot be written leaves no file behind
+        data = self.to_bytes()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+class ReplayRecorder:
+    # Collects the actions of one run, indexed by simulation frame
+    def __init__(self, seed):
+        self.replay = Replay(seed)
+    
+    def record(self, frame, code):
+        if code > ACTION_MASK:
+            raise ValueError("Action code %d does not fit in %d bits" % (code, ACTION_BITS))
+        self.replay.events.append((frame, code))
+    
+    def finish(self, frames):
+        self.replay.frames = frames
+        return self.replay
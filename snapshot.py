@@ -0,0 +1,228 @@
+import zlib
+import struct
+from collections import deque
+
+import numpy as np
+
+from levelgen import OBSTACLE
+from gametypes import POWERUPS
+
+# Snapshot layout, little-endian and fixed apart from the entity rows:
+#   GAME header, one BG_LAYER per background layer, PLAYER, the level
+#   stream's position in its current chunk, LEVEL with the generator's RNG
+#   and every spawn record of that chunk, then each entity store's columns
+#   (count rows each, in ENTITY_COLUMNS order), obstacles first.
+# The RNG is its 624-word Mersenne Twister state, the position in it and the
+# cached gaussian (NaN for none). The game's own RNG is left out: it is only
+# drawn from in reset_game, right after being reseeded. Everything a step
+# reads is included, so a restored game continues exactly as the original
+# did; particles, frame timing and the input buffer are not. The version in
+# MAGIC changes whenever the layout does.
+MAGIC = b"TRS3"
+GAME = struct.Struct("<4sqbqqqiidddiii4i4iB")
+BG_LAYER = struct.Struct("<i")
+PLAYER = struct.Struct("<bddiiddd??iii?idd?")
+RNG = struct.Struct("<625Id")
+CHUNK_INDEX = struct.Struct("<I")
+LEVEL = struct.Struct("<dddI")  # cursor, last_tail (NaN for None), its track distance, records in the chunk
+RECORD = struct.Struct("<dBBBb")  # distance, kind, lane, type id in that kind's store, direction
+STORES = struct.Struct("<II?")
+
+def pack_rng(out, state):
+    version, words, gauss = state
+    out += RNG.pack(*words, float("nan") if gauss is None else gauss)
+
+def unpack_rng(data, pos):
+    values = RNG.unpack_from(data, pos)
+    gauss = values[-1]
+    return (3, values[:-1], None if gauss != gauss else gauss), pos + RNG.size
+
+# The level section only changes when a new chunk starts, so cloning a game
+# over and over (bot search, rewinding) mostly packs and parses the same
+# bytes again. Packed sections are kept for the last few chunk objects seen,
+# including the ones restored streams were given; parsing keeps the last one.
+PACKED_LEVELS = 8
+_packed_levels = {}  # id(chunk) -> (chunk, resume, bytes)
+_parsed_level = [b"", None, None]  # bytes, chunk, resume
+
+def pack_level(level, obstacles, collectibles):
+    chunk, resume = level.chunk, level.resume
+    entry = _packed_levels.get(id(chunk))
+    if entry and entry[0] is chunk and entry[1] is resume:
+        return entry[2]
+    rng_state, cursor, last_tail, track_end = resume
+    out = bytearray(LEVEL.pack(cursor, float("nan") if last_tail is None else last_tail, track_end, len(chunk)))
+    pack_rng(out, rng_state)
+    for distance, kind, lane, entity_type, direction in chunk:
+        store = obstacles if kind == OBSTACLE else collectibles
+        out += RECORD.pack(distance, kind, lane, store.type_ids[entity_type], direction)
+    remember_level(chunk, resume, bytes(out))
+    return _packed_levels[id(chunk)][2]
+
+def remember_level(chunk, resume, block):
+    if len(_packed_levels) >= PACKED_LEVELS:
+        del _packed_levels[next(iter(_packed_levels))]
+    _packed_levels[id(chunk)] = (chunk, resume, block)
+
+def unpack_level(data, pos, obstacles, collectibles):
+    # (chunk, resume) as LevelStream.restore takes them, and the position after
+    count = LEVEL.unpack_from(data, pos)[-1]
+    end = pos + LEVEL.size + RNG.size + count * RECORD.size
+    block = data[pos:end]
+    if block != _parsed_level[0]:
+        cursor, last_tail, track_end, count = LEVEL.unpack_from(block, 0)
+        rng_state, records = unpack_rng(block, LEVEL.size)
+        chunk = []
+        for distance, kind, lane, type_id, direction in RECORD.iter_unpack(block[records:]):
+            store = obstacles if kind == OBSTACLE else collectibles
+            chunk.append((distance, kind, lane, store.type_names[type_id], direction))
+        _parsed_level[:] = block, chunk, (rng_state, cursor, None if last_tail != last_tail else last_tail, track_end)
+        remember_level(chunk, _parsed_level[2], block)
+    return _parsed_level[1], _parsed_level[2], end
+
+def capture(game):
+    # The game's state as bytes; see the layout above
+    player = game.player
+    level = game.level
+    obstacles = game.obstacles
+    collectibles = game.collectibles
+    
+    death = -1 if game.death_cause is None else obstacles.type_ids[game.death_cause]
+    out = bytearray(GAME.pack(
+        MAGIC, game.frame, game.state, game.seed, game.score, game.coins, game.lives, death,
+        game.base_speed, game.game_speed, game.distance, game.screen_shake, game.combo, game.combo_timer,
+        *[game.powerups[powerup] for powerup in POWERUPS],
+        *[game.powerup_frames[powerup] for powerup in POWERUPS],
+        len(game.bg_layers)))
+    for layer in game.bg_layers:
+        out += BG_LAYER.pack(layer["x"])
+    out += PLAYER.pack(
+        player.lane, player.x, player.y, player.width, player.height, player.ground_y, player.velocity_y,
+        player.target_x, player.is_jumping, player.is_sliding, player.slide_timer, player.animation_frame,
+        player.animation_timer, player.invincible, player.invincible_timer, player.prev_x, player.prev_y,
+        player.moving)
+    
+    # The level resumes from the generator state right after the current
+    # chunk was built, with the rest of that chunk still to come
+    out += CHUNK_INDEX.pack(level.index)
+    out += pack_level(level, obstacles, collectibles)
+    
+    out += STORES.pack(obstacles.count, collectibles.count, collectibles.y_moved)
+    obstacles.dump(out)
+    collectibles.dump(out)
+    return bytes(out)
+
+def restore(game, data):
+    # Put game back in the state data was captured from
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a game snapshot")
+    player = game.player
+    obstacles = game.obstacles
+    collectibles = game.collectibles
+    
+    (_, game.frame, game.state, game.seed, game.score, game.coins, game.lives, death,
+     game.base_speed, game.game_speed, game.distance, game.screen_shake, game.combo, game.combo_timer,
+     *values, layers) = GAME.unpack_from(data, 0)
+    game.death_cause = None if death < 0 else obstacles.type_names[death]
+    game.powerups = dict(zip(POWERUPS, values[:len(POWERUPS)]))
+    game.powerup_frames = dict(zip(POWERUPS, values[len(POWERUPS):]))
+    pos = GAME.size
+    if layers != len(game.bg_layers):
+        raise ValueError("Snapshot has %d background layers, expected %d" % (layers, len(game.bg_layers)))
+    for layer in game.bg_layers:
+        layer["x"], = BG_LAYER.unpack_from(data, pos)
+        pos += BG_LAYER.size
+    
+    (player.lane, player.x, player.y, player.width, player.height, player.ground_y, player.velocity_y,
+     player.target_x, player.is_jumping, player.is_sliding, player.slide_timer, player.animation_frame,
+     player.animation_timer, player.invincible, player.invincible_timer, player.prev_x, player.prev_y,
+     player.moving) = PLAYER.unpack_from(data, pos)
+    pos += PLAYER.size
+    
+    index, = CHUNK_INDEX.unpack_from(data, pos)
+    chunk, resume, pos = unpack_level(data, pos + CHUNK_INDEX.size, obstacles, collectibles)
+    game.level.restore(chunk, resume, index)
+    
+    obstacle_count, collectible_count, collectibles.y_moved = STORES.unpack_from(data, pos)
+    pos += STORES.size
+    pos = obstacles.load(data, pos, obstacle_count)
+    collectibles.load(data, pos, collectible_count)
+
+class RewindBuffer:
+    # The last `capacity` per-frame snapshots, oldest first. Every
+    # keyframe_interval-th one is kept whole; the rest as their XOR against
+    # the keyframe before them, which is mostly zeros between nearby frames.
+    # Both are zlib-compressed, so memory is bounded by capacity frames of
+    # a few hundred bytes each.
+    def __init__(self, capacity, keyframe_interval=60, level=1):
+        self.capacity = capacity
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self.entries = deque()  # (frame, keyframe entry or None, compressed bytes)
+        self.keyframe = None  # Latest keyframe entry and its raw snapshot
+        self.key_data = None
+        self.since_key = 0
+        self.size = 0  # Compressed bytes held
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def clear(self):
+        self.entries.clear()
+        self.keyframe = None
+        self.key_data = None
+        self.since_key = 0
+        self.size = 0
+    
+    def push(self, frame, data):
+        if self.keyframe is None or self.since_key >= self.keyframe_interval:
+            entry = (frame, None, zlib.compress(data, self.level))
+            self.keyframe = entry
+            self.key_data = data
+            self.since_key = 0
+        else:
+            entry = (frame, self.keyframe, zlib.compress(xor(data, self.key_data), self.level))
+        self.since_key += 1
+        self.entries.append(entry)
+        self.size += len(entry[2])
+        while len(self.entries) > self.capacity:
+            self.size -= len(self.entries.popleft()[2])
+    
+    def oldest(self):
+        return self.entries[0][0] if self.entries else None
+    
+    def get(self, frame):
+        # The snapshot taken at frame, or None if it is no longer held
+        entries = self.entries
+        if not entries or not entries[0][0] <= frame <= entries[-1][0]:
+            return None
+        _, keyframe, compressed = entries[frame - entries[0][0]]
+        data = zlib.decompress(compressed)
+        if keyframe is None:
+            return data
+        return xor(data, zlib.decompress(keyframe[2]))
+    
+    def truncate(self, frame):
+        # Forget the snapshots after frame, e.g. once the game was rewound to it
+        entries = self.entries
+        while entries and entries[-1][0] > frame:
+            entry = entries.pop()
+            self.size -= len(entry[2])
+            if entry is self.keyframe:
+                self.keyframe = None
+                self.key_data = None
+        if self.keyframe is not None:
+            self.since_key = frame - self.keyframe[0] + 1
+    
+    def stats(self):
+        return {"frames": len(self.entries), "bytes": self.size,
+                "bytes_per_frame": round(self.size / max(len(self.entries), 1), 1)}
+
+def xor(data, key):
+    # data XOR key, with key cut or zero-padded to data's length
+    data = np.frombuffer(data, np.uint8)
+    key = np.frombuffer(key, np.uint8)
+    out = data.copy()
+    length = min(len(data), len(key))
+    out[:length] ^= key[:length]
+    return out.tobytes()
@@ -0,0 +1,204 @@
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+import multiprocessing
+
+import numpy as np
+
+from templerun_claude import (Game, RandomInput, ACTION_JUMP, ACTION_SLIDE, SCALAR_ENTITIES,
+                              START_SPEED, SEGMENT_GAP, COLLECTIBLE_RARITY)
+from gametypes import OBSTACLE_TYPES, POWERUPS
+
+# One record per run; workers send whole chunks of these back in one message
+RESULT_DTYPE = np.dtype([
+    ("point", np.int32),
+    ("seed", np.uint32),
+    ("frames", np.int32),
+    ("score", np.int32),
+    ("distance", np.float32),
+    ("coins", np.int32),
+    ("death", np.int8),  # Index into OBSTACLE_TYPES, -1 if the run hit max_frames
+    ("uptime", np.float32, (len(POWERUPS),))  # Fraction of frames each power-up was active
+])
+
+class ReactiveBot:
+    # Scripted policy: reacts to the nearest obstacle approaching its lane
+    def __init__(self, reaction_distance=140):
+        self.reaction_distance = reaction_distance
+    
+    def __call__(self, game, frame):
+        player = game.player
+        obstacles = game.obstacles
+        count = obstacles.count
+        left = player.x - player.width // 2
+        if count <= SCALAR_ENTITIES:
+            nearest = None
+            for i in range(count):
+                x = obstacles.x.item(i)
+                if x + obstacles.width.item(i) > left and (nearest is None or x < nearest_x):
+                    nearest, nearest_x = i, x
+            if nearest is None:
+                return ()
+        else:
+            x = obstacles.x[:count]
+            ahead = (x + obstacles.width[:count] > left).nonzero()[0]
+            if not len(ahead):
+                return ()
+            nearest = ahead[np.argmin(x[ahead])]
+            nearest_x = x[nearest]
+        if nearest_x - (player.x + player.width // 2) > self.reaction_distance:
+            return ()
+        
+        # Every obstacle sweeps across all lanes, so only jumping or sliding helps
+        if obstacles.type_name(nearest) == "low":
+            return (ACTION_SLIDE,)
+        return (ACTION_JUMP,)
+
+POLICIES = {
+    "random": lambda seed: RandomInput(seed),
+    "bot": lambda seed: ReactiveBot()
+}
+
+def build_grid(spec):
+    # spec maps tuning keys to lists of values; returns the cartesian product
+    keys = sorted(spec)
+    return [dict(zip(keys, values)) for values in itertools.product(*(spec[key] for key in keys))]
+
+# Per-process state, created once by the pool initializer
+_worker = {}
+
+def init_worker(grid, policy, max_frames):
+    _worker["game"] = Game(headless=True)
+    _worker["grid"] = grid
+    _worker["policy"] = POLICIES[policy]
+    _worker["max_frames"] = max_frames
+
+def run_chunk(chunk):
+    # (offset, jobs) -> (offset, results), so chunks can finish in any order
+    offset, jobs = chunk
+    game = _worker["game"]
+    grid = _worker["grid"]
+    make_policy = _worker["policy"]
+    max_frames = _worker["max_frames"]
+    results = np.zeros(len(jobs), dtype=RESULT_DTYPE)
+    
+    for i, (point, seed) in enumerate(jobs):
+        game.configure(grid[point])
+        game.start_run(seed)
+        outcome = game.run_headless(max_frames, make_policy(seed))
+        
+        record = results[i]
+        record["point"] = point
+        record["seed"] = seed
+        record["frames"] = outcome["frames"]
+        record["score"] = outcome["score"]
+        record["distance"] = outcome["distance"]
+        record["coins"] = outcome["coins"]
+        record["death"] = OBSTACLE_TYPES.index(game.death_cause) if game.death_cause else -1
+        frames = max(outcome["frames"], 1)
+        record["uptime"] = [game.powerup_frames[powerup] / frames for powerup in POWERUPS]
+    
+    return offset, results
+
+def run_sweep(grid, runs_per_point, policy="random", max_frames=36000, processes=None,
+              chunk_size=32, base_seed=0, progress=None):
+    # Returns a RESULT_DTYPE array with runs_per_point runs for every grid
+    # point, in job order; the same base_seed always gives the same array
+    seeds = random.Random(base_seed)
+    jobs = [(point, seeds.getrandbits(32)) for point in range(len(grid)) for _ in range(runs_per_point)]
+    chunks = [(i, jobs[i:i + chunk_size]) for i in range(0, len(jobs), chunk_size)]
+    
+    results = np.zeros(len(jobs), dtype=RESULT_DTYPE)
+    done = 0
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=(grid, policy, max_frames)) as pool:
+        for offset, chunk in pool.imap_unordered(run_chunk, chunks):
+            results[offset:offset + len(chunk)] = chunk
+            done += len(chunk)
+            if progress:
+                progress(done, len(jobs))
+    return results
+
+def summarize(grid, results):
+    summary = []
+    for point, tuning in enumerate(grid):
+        runs = results[results["point"] == point]
+        if len(runs) == 0:
+            continue
+        deaths = runs["death"]
+        summary.append({
+            "tuning": tuning,
+            "runs": int(len(runs)),
+            "mean_distance": float(runs["distance"].mean()),
+            "median_distance": float(np.median(runs["distance"])),
+            "mean_score": float(runs["score"].mean()),
+            "mean_coins": float(runs["coins"].mean()),
+            "survived": int((deaths < 0).sum()),
+            "deaths": {cause: int((deaths == i).sum()) for i, cause in enumerate(OBSTACLE_TYPES)},
+            "uptime": {powerup: float(runs["uptime"][:, i].mean()) for i, powerup in enumerate(POWERUPS)}
+        })
+    return summary
+
+def parse_interval(text):
+    low, high = text.split(":")
+    return (int(low), int(high))
+
+def main():
+    parser = argparse.ArgumentParser(description="Run seeded balance simulations across all cores")
+    parser.add_argument("--runs", type=int, default=100, help="runs per grid point")
+    parser.add_argument("--policy", choices=list(POLICIES), default="random")
+    parser.add_argument("--max-frames", type=int, default=36000)
+    parser.add_argument("--start-speed", type=float, nargs="+", default=[START_SPEED])
+    parser.add_argument("--segment-gap", type=parse_interval, nargs="+", default=[SEGMENT_GAP],
+                        metavar="MIN:MAX", help="extra track distance between level segments")
+    parser.add_argument("--grid", metavar="FILE",
+                        help="JSON object of tuning key -> list of values (overrides the flags above)")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", metavar="FILE", help="save every run as a NumPy .npy record array")
+    parser.add_argument("--summary", metavar="FILE", help="save the per-point summary as JSON")
+    args = parser.parse_args()
+    
+    if args.grid:
+        with open(args.grid) as f:
+            spec = json.load(f)
+        if "collectible_rarity" in spec:
+            spec["collectible_rarity"] = [[tuple(pair) for pair in rarity] for rarity in spec["collectible_rarity"]]
+    else:
+        spec = {
+            "start_speed": args.start_speed,
+            "segment_gap": args.segment_gap,
+            "collectible_rarity": [COLLECTIBLE_RARITY]
+        }
+    grid = build_grid(spec)
+    
+    start = time.perf_counter()
+    total = len(grid) * args.runs
+    
+    def progress(done, total):
+        sys.stderr.write("\r%d/%d runs" % (done, total))
+        sys.stderr.flush()
+    
+    results = run_sweep(grid, args.runs, args.policy, args.max_frames, args.processes,
+                        args.chunk_size, args.seed, progress)
+    elapsed = time.perf_counter() - start
+    sys.stderr.write("\n%d runs, %d frames in %.1fs (%.0f frames/s)\n" % (
+        total, int(results["frames"].sum()), elapsed, results["frames"].sum() / elapsed))
+    
+    summary = summarize(grid, results)
+    for entry in summary:
+        print("%s: distance %.0f (median %.0f), score %.0f, survived %d/%d, deaths %s" % (
+            json.dumps(entry["tuning"]), entry["mean_distance"], entry["median_distance"],
+            entry["mean_score"], entry["survived"], entry["runs"], entry["deaths"]))
+    
+    if args.out:
+        np.save(args.out, results)
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+import os
+import sys
+import json
+import time
+import glob
+import queue
+import struct
+import argparse
+import threading
+
+import numpy as np
+
+from gametypes import OBSTACLE_TYPES, COLLECTIBLE_TYPES, POWERUPS, STATE_NAMES as STATES
+
+# Event log layout: back-to-back fixed-size little-endian RECORDs, no header,
+# so a file (or any prefix of one) is an array of DTYPE. Each record carries
+# the session that wrote it, the run within that session, and the game state
+# at the time: frame, player lane, lives left, distance, score and
+# milliseconds since the session started. What subject and value hold
+# depends on the event (types and states are positions in gametypes' tables):
+#   run_start      -                      seed
+#   run_end        state it ended in      frames played
+#   hit            obstacle type          - (lives is 0 for the fatal one)
+#   shielded       obstacle type          -  (hit while invincible)
+#   collect        collectible type       points scored
+#   combo          -                      coins in the combo that ran out
+#   powerup_start  power-up               frames granted
+#   powerup_end    power-up               frames it ran so far this run
+#   uptime         power-up               frames it ran in the whole run (at run_end)
+#   state          new state              previous state
+#   rewind         -                      frame jumped from (to the record's frame)
+EVENTS = ["run_start", "run_end", "hit", "shielded", "collect", "combo", "powerup_start", "powerup_end",
+          "uptime", "state", "rewind"]
+(EVENT_RUN_START, EVENT_RUN_END, EVENT_HIT, EVENT_SHIELDED, EVENT_COLLECT, EVENT_COMBO, EVENT_POWERUP_START,
+ EVENT_POWERUP_END, EVENT_UPTIME, EVENT_STATE, EVENT_REWIND) = range(len(EVENTS))
+
+RECORD = struct.Struct("<IIIBBBBfIII")
+DTYPE = np.dtype([
+    ("session", "<u4"), ("run", "<u4"), ("frame", "<u4"), ("event", "u1"), ("subject", "u1"),
+    ("lane", "u1"), ("lives", "u1"), ("distance", "<f4"), ("value", "<u4"), ("score", "<u4"), ("time_ms", "<u4")
+])
+assert DTYPE.itemsize == RECORD.size
+
+EXTENSION = ".trl"
+BUFFER_RECORDS = 2048  # Records gathered in memory before a buffer goes to the writer
+MAX_BUFFERS = 16  # Buffers in flight before new records are dropped instead of waiting on the disk
+FLUSH_INTERVAL = 1.0  # Seconds a partly filled buffer may wait before it is handed over anyway
+ROTATE_BYTES = 64 * 1024 * 1024  # Files are closed and a new one started past this size
+DISTANCE_BUCKET = 1000  # Width of the death distance histogram's buckets
+
+class Telemetry:
+    # Append-only binary event log. log() packs the record into an in-memory
+    # buffer; full buffers are handed to a writer thread, and so are partly
+    # filled ones once FLUSH_INTERVAL has passed (checked by log() and by
+    # tick(), which the game calls every frame). The writer appends them to
+    # the current file and starts a new one every ROTATE_BYTES. The game
+    # never waits on the disk: if the writer falls MAX_BUFFERS behind,
+    # records are dropped and counted instead.
+    def __init__(self, directory, buffer_records=BUFFER_RECORDS, max_buffers=MAX_BUFFERS,
+                 flush_interval=FLUSH_INTERVAL, rotate_bytes=ROTATE_BYTES):
+        self.directory = directory
+        self.session = int.from_bytes(os.urandom(4), "little")
+        self.run = 0
+        self.start = time.perf_counter()
+        self.flush_interval = flush_interval
+        self.deadline = self.start + flush_interval
+        self.dropped = 0
+        
+        # Game thread side: the buffer being filled and the buffers handed back
+        self.capacity = buffer_records * RECORD.size
+        self.buffer = bytearray(self.capacity)
+        self.used = 0
+        self.buffers = 1
+        self.max_buffers = max_buffers
+        self.free = queue.Queue()
+        
+        # Writer thread side
+        self.rotate_bytes = rotate_bytes
+        self.file = None
+        self.file_bytes = 0
+        self.files = []
+        self.written = 0
+        self.failed = False
+        self.pending = queue.Queue()
+        self.thread = threading.Thread(target=self.write_loop, name="telemetry", daemon=True)
+        self.thread.start()
+    
+    def begin_run(self):
+        self.run += 1
+    
+    def log(self, event, frame, subject, lane, lives, distance, value, score):
+        now = time.perf_counter()
+        if self.used == self.capacity and not self.flush():
+            self.dropped += 1
+            return
+        RECORD.pack_into(self.buffer, self.used, self.session, self.run, frame, event, subject, lane, lives,
+                         distance, value, score, int((now - self.start) * 1000))
+        self.used += RECORD.size
+        if self.used == self.capacity or now >= self.deadline:
+            self.deadline = now + self.flush_interval
+            self.flush()
+    
+    def tick(self):
+        # Flush a partly filled buffer past its deadline even when nothing
+        # else gets logged; costs one comparison while the buffer is empty
+        if self.used:
+            now = time.perf_counter()
+            if now >= self.deadline:
+                self.deadline = now + self.flush_interval
+                self.flush()
+    
+    def flush(self):
+        # Hand the buffered records to the writer and carry on in a free
+        # buffer; False if every buffer is still waiting to be written
+        if not self.used:
+            return True
+        try:
+            fresh = self.free.get_nowait()
+        except queue.Empty:
+            if self.buffers >= self.max_buffers:
+                return False
+            fresh = bytearray(self.capacity)
+            self.buffers += 1
+        self.pending.put((self.buffer, self.used))
+        self.buffer = fresh
+        self.used = 0
+        return True
+    
+    def close(self, timeout=5.0):
+        # Write out everything logged so far and stop the writer
+        if self.used:
+            self.pending.put((self.buffer, self.used))
+            self.buffer = bytearray(self.capacity)
+            self.used = 0
+        self.pending.put(None)
+        self.thread.join(timeout)
+    
+    def stats(self):
+        return {"session": "%08x" % self.session, "runs": self.run, "records": self.written,
+                "dropped": self.dropped, "files": len(self.files)}
+    
+    def report(self, message, error):
+        sys.stderr.write("Telemetry %s: %s\n" % (message, error))
+    
+    def open_file(self):
+        if self.file:
+            self.file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, "events_%s_%08x_%04d%s" % (
+            time.strftime("%Y%m%d-%H%M%S"), self.session, len(self.files), EXTENSION))
+        self.file = open(path, "wb")
+        self.file_bytes = 0
+        self.files.append(path)
+    
+    def write_loop(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            buffer, used = item
+            if not self.failed:
+                try:
+                    if self.file is None or self.file_bytes >= self.rotate_bytes:
+                        self.open_file()
+                    self.file.write(memoryview(buffer)[:used])
+                    self.file_bytes += used
+                    self.written += used // RECORD.size
+                    if self.pending.empty():
+                        self.file.flush()
+                except OSError as error:
+                    # Keep taking buffers so the game never backs up behind a broken disk
+                    self.failed = True
+                    self.report("disabled, events will not be saved", error)
+            self.free.put(buffer)
+        
+        if self.file:
+            try:
+                self.file.close()
+            except OSError as error:
+                self.report("could not close %s" % self.files[-1], error)
+
+def log_files(paths):
+    # Event logs among paths, with directories searched for EXTENSION files
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*" + EXTENSION))))
+        else:
+            files.append(path)
+    return files
+
+def load(path):
+    # The file's records as a read-only memory-mapped array; a record cut
+    # short by a crash at the end is left out
+    count = os.path.getsize(path) // DTYPE.itemsize
+    if not count:
+        return np.zeros(0, dtype=DTYPE)
+    return np.memmap(path, dtype=DTYPE, mode="r", shape=(count,))
+
+def accumulate(totals, name, counts):
+    # totals[name] += counts, growing either to the longer length
+    total = totals.get(name)
+    if total is None:
+        totals[name] = counts.copy()
+        return
+    if len(counts) > len(total):
+        total = np.concatenate([total, np.zeros(len(counts) - len(total), dtype=total.dtype)])
+    total[:len(counts)] += counts
+    totals[name] = total
+
+def aggregate(records, totals):
+    # Add one array of records to the running totals. Every statistic is a
+    # count or sum, so files can be aggregated one at a time in any order.
+    # The columns most statistics need are copied out of the map once;
+    # gathering whole records instead is several times slower.
+    event = np.ascontiguousarray(records["event"])
+    subject = np.ascontiguousarray(records["subject"])
+    value = np.ascontiguousarray(records["value"])
+    accumulate(totals, "records", np.array([len(records)]))
+    accumulate(totals, "events", np.bincount(event, minlength=len(EVENTS)))
+    
+    ends = event == EVENT_RUN_END
+    accumulate(totals, "run_ends", np.bincount(subject[ends], minlength=len(STATES)))
+    accumulate(totals, "frames", np.array([value[ends].sum(dtype=np.int64)]))
+    accumulate(totals, "final_score", np.array([records["score"][ends].sum(dtype=np.int64)]))
+    
+    hits = np.flatnonzero(event == EVENT_HIT)
+    deaths = hits[records["lives"][hits] == 0]
+    distances = records["distance"][deaths]
+    accumulate(totals, "hits", np.bincount(subject[hits], minlength=len(OBSTACLE_TYPES)))
+    accumulate(totals, "deaths", np.bincount(subject[deaths], minlength=len(OBSTACLE_TYPES)))
+    accumulate(totals, "death_lanes", np.bincount(records["lane"][deaths], minlength=3))
+    accumulate(totals, "death_distances", np.bincount((distances // DISTANCE_BUCKET).astype(np.intp)))
+    accumulate(totals, "death_distance_sum", np.array([distances.sum(dtype=np.float64)]))
+    accumulate(totals, "shielded", np.bincount(subject[event == EVENT_SHIELDED], minlength=len(OBSTACLE_TYPES)))
+    
+    collected = event == EVENT_COLLECT
+    accumulate(totals, "collected", np.bincount(subject[collected], minlength=len(COLLECTIBLE_TYPES)))
+    accumulate(totals, "points", np.bincount(subject[collected], value[collected],
+                                             minlength=len(COLLECTIBLE_TYPES)).astype(np.int64))
+    
+    accumulate(totals, "combos", np.bincount(value[event == EVENT_COMBO]))
+    
+    accumulate(totals, "pickups", np.bincount(subject[event == EVENT_POWERUP_START], minlength=len(POWERUPS)))
+    uptime = event == EVENT_UPTIME
+    accumulate(totals, "uptime", np.bincount(subject[uptime], value[uptime], minlength=len(POWERUPS)).astype(np.int64))
+    
+    states = event == EVENT_STATE
+    transitions = value[states].astype(np.intp) * len(STATES) + subject[states]
+    accumulate(totals, "transitions", np.bincount(transitions, minlength=len(STATES) ** 2))
+
+def analyze(paths):
+    totals = {}
+    for path in log_files(paths):
+        aggregate(load(path), totals)
+    return totals
+
+def percentile_of_counts(counts, fraction):
+    # Smallest value at or below which fraction of the counted values lie
+    total = counts.sum()
+    if not total:
+        return 0
+    return int(np.searchsorted(np.cumsum(counts), fraction * total))
+
+def named(names, counts):
+    return {name: int(count) for name, count in zip(names, counts)}
+
+def report(totals):
+    # Summary of aggregate()'s totals as plain values
+    if not totals:
+        return {"records": 0}
+    frames = int(totals["frames"][0])
+    runs = int(totals["run_ends"].sum())
+    deaths = totals["deaths"]
+    combos = totals["combos"]
+    combo_count = int(combos.sum())
+    transitions = totals["transitions"].reshape(len(STATES), len(STATES))
+    return {
+        "records": int(totals["records"][0]),
+        "events": named(EVENTS, totals["events"]),
+        "runs": {
+            "started": int(totals["events"][EVENT_RUN_START]),
+            "finished": runs,
+            "ended_by": named(STATES, totals["run_ends"]),
+            "mean_frames": round(frames / max(runs, 1), 1),
+            "mean_score": round(int(totals["final_score"][0]) / max(runs, 1), 1)
+        },
+        "deaths": {
+            "total": int(deaths.sum()),
+            "by_obstacle": named(OBSTACLE_TYPES, deaths),
+            "by_lane": named(["left", "middle", "right"], totals["death_lanes"]),
+            "mean_distance": round(float(totals["death_distance_sum"][0]) / max(int(deaths.sum()), 1), 1),
+            "median_distance": percentile_of_counts(totals["death_distances"], 0.5) * DISTANCE_BUCKET,
+            "distance_histogram": {"%d-%d" % (i * DISTANCE_BUCKET, (i + 1) * DISTANCE_BUCKET): int(count)
+                                   for i, count in enumerate(totals["death_distances"]) if count}
+        },
+        "hits": named(OBSTACLE_TYPES, totals["hits"]),
+        "shielded": named(OBSTACLE_TYPES, totals["shielded"]),
+        "collected": named(COLLECTIBLE_TYPES, totals["collected"]),
+        "points": named(COLLECTIBLE_TYPES, totals["points"]),
+        "combos": {
+            "count": combo_count,
+            "mean": round(float((combos * np.arange(len(combos))).sum()) / max(combo_count, 1), 2),
+            "median": percentile_of_counts(combos, 0.5),
+            "p90": percentile_of_counts(combos, 0.9),
+            "max": int(np.flatnonzero(combos)[-1]) if combo_count else 0
+        },
+        "powerups": {
+            powerup: {"pickups": int(totals["pickups"][i]),
+                      "uptime": round(int(totals["uptime"][i]) / max(frames, 1), 4)}
+            for i, powerup in enumerate(POWERUPS)
+        },
+        "transitions": {"%s->%s" % (STATES[old], STATES[new]): int(transitions[old, new])
+                        for old in range(len(STATES)) for new in range(len(STATES)) if transitions[old, new]}
+    }
+
+def print_report(summary):
+    print("%d records" % summary["records"])
+    if not summary["records"]:
+        return
+    runs = summary["runs"]
+    print("runs: %d started, %d finished (%s), mean %.0f frames, mean score %.0f" % (
+        runs["started"], runs["finished"], ", ".join("%s %d" % item for item in runs["ended_by"].items() if item[1]),
+        runs["mean_frames"], runs["mean_score"]))
+    deaths = summary["deaths"]
+    print("deaths: %d, mean distance %.0f, median ~%d" % (deaths["total"], deaths["mean_distance"],
+                                                          deaths["median_distance"]))
+    for obstacle, count in deaths["by_obstacle"].items():
+        print("  %-13s %6d deaths  %6d hits  %6d shielded" % (
+            obstacle, count, summary["hits"][obstacle], summary["shielded"][obstacle]))
+    print("  by lane: %s" % ", ".join("%s %d" % item for item in deaths["by_lane"].items()))
+    for collectible, count in summary["collected"].items():
+        print("  %-13s %6d collected  %8d points" % (collectible, count, summary["points"][collectible]))
+    combos = summary["combos"]
+    print("combos: %d, mean %.2f, median %d, p90 %d, max %d" % (
+        combos["count"], combos["mean"], combos["median"], combos["p90"], combos["max"]))
+    for powerup, stats in summary["powerups"].items():
+        print("  %-13s %6d pickups  %5.1f%% uptime" % (powerup, stats["pickups"], stats["uptime"] * 100))
+    if summary["transitions"]:
+        print("states: %s" % ", ".join("%s %d" % item for item in summary["transitions"].items()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate telemetry event logs")
+    parser.add_argument("paths", nargs="+", metavar="PATH", help="event log files or directories holding them")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    summary = report(analyze(args.paths))
+    summary["seconds"] = round(time.perf_counter() - start, 4)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+        print("aggregated in %.3f s" % summary["seconds"])
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,107 @@
+import time
+
+# Taken before anything else is imported so the startup report covers it
+LAUNCH_TIME = time.perf_counter()
+
 import pygame
+import numpy as np
 import random
 import math
 import json
 import os
+from collections import OrderedDict, deque
+
+from replay import Replay, ReplayRecorder
+from snapshot import RewindBuffer, capture, restore
+from profiler import FrameProfiler
+from levelgen import LevelStream, build_library, OBSTACLE
+from leaderboard import Leaderboard, LEADERBOARD_PATH
+from gametypes import OBSTACLE_TYPES, COLLECTIBLE_TYPES, POWERUPS, MENU, PLAYING, GAME_OVER, PAUSED
+from telemetry import (Telemetry, EVENT_RUN_START, EVENT_RUN_END, EVENT_HIT, EVENT_SHIELDED, EVENT_COLLECT,
+                       EVENT_COMBO, EVENT_POWERUP_START, EVENT_POWERUP_END, EVENT_UPTIME, EVENT_STATE, EVENT_REWIND)
+import argparse
 
-# Initialize Pygame
-pygame.init()
+IMPORT_TIME = time.perf_counter()
+
+def init_pygame():
+    # Only the subsystems the game uses; pygame.init() would also start the
+    # audio mixer and joysticks. Importing this module initializes nothing.
+    pygame.display.init()
+    pygame.font.init()
+    
+    # Only queue the events the game reads, so handle_events never wades
+    # through mouse motion, text input or window chatter
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed(ALLOWED_EVENTS)
 
 # Game Constants
 SCREEN_WIDTH = 1200
 SCREEN_HEIGHT = 800
 FPS = 60
+SIM_DT = 1.0 / FPS  # All frame-based timers and speeds count fixed simulation steps
+MAX_STEPS_PER_FRAME = 5  # Cap catch-up after a long stall instead of spiralling
+RENDER_SCALES = [0.5, 0.75, 1.0]  # Internal world resolution as a fraction of the window
+RENDER_RATES = {"uncapped": 0, "60": 60, "144": 144, "vsync": "vsync"}
+IDLE_FPS = 15  # Loop rate while a paused or game-over screen sits unchanged
 GRAVITY = 0.8
+SPEED_BOOST = 1.5  # Game speed multiplier while the speed power-up runs
 JUMP_STRENGTH = -15
 SLIDE_DURATION = 30
+JUMP_FRAMES = int(2 * -JUMP_STRENGTH / GRAVITY) + 1  # Frames from take-off to landing
 LANE_WIDTH = SCREEN_WIDTH // 3
 LANES = [LANE_WIDTH // 2, SCREEN_WIDTH // 2, SCREEN_WIDTH - LANE_WIDTH // 2]
+DESPAWN_X = -100  # Entities left of this are dropped
+MAGNET_RADIUS = 150
+MAGNET_STRENGTH = 0.1  # Fraction of the distance to the player covered per step
+MAX_SEED = 2 ** 32 - 1  # Seeds are stored as unsigned 32-bit fields (leaderboard, telemetry)
+
+# Balance defaults; a Game can override any of them through its tuning dict
+START_SPEED = 8
+SEGMENT_GAP = (0, 240)  # Extra track distance between level segments (min, max)
+COLLECTIBLE_RARITY = [(0.6, "coin"), (0.8, "gem"), (0.9, "magnet"), (0.95, "speed"), (1.0, "invincibility")]
+TUNING_KEYS = ["start_speed", "segment_gap", "collectible_rarity"]
+
+# Level segments are validated once at startup: every obstacle must leave
+# enough clear track to land a jump at LEVEL_SPEED. Moving obstacles can drift
+# 2 px per frame either way while they cross the screen. The stream stretches
+# chunks started faster than that: it is told the boosted speed the game could
+# reach while the chunk passes, allowing LEVEL_SPEED_MARGIN of difficulty
+# increases on the way.
+LEVEL_SPEED = 12
+LEVEL_SPEED_MARGIN = 1.0
+LEVEL_MIN_GAP = JUMP_FRAMES * LEVEL_SPEED
+MOVING_SLACK = 2 * SCREEN_WIDTH // (START_SPEED - 2)
+OBSTACLE_EXTENTS = {
+    "barrier": (0, 60),
+    "low": (0, 60),
+    "pit": (0, 120),
+    "moving": (-MOVING_SLACK, 60 + MOVING_SLACK)
+}
+LEVEL_LIBRARY = build_library(LEVEL_MIN_GAP, OBSTACLE_EXTENTS)
+
+MAX_PARTICLES = 1024
+
+# Detail levels, lowest first. particles scales every emission, parallax draws
+# the scrolling layers (off: the pre-baked static background), spikes adds the
+# barrier spikes, float bobs collectibles, and the HUD is redrawn every
+# hud_interval frames (in between, a cached copy is blitted).
+QUALITY_LEVELS = [
+    {"name": "low", "particles": 0.25, "parallax": False, "spikes": False, "float": False, "hud_interval": 4},
+    {"name": "medium", "particles": 0.5, "parallax": False, "spikes": True, "float": True, "hud_interval": 2},
+    {"name": "high", "particles": 1.0, "parallax": True, "spikes": True, "float": True, "hud_interval": 1}
+]
+QUALITY_NAMES = [level["name"] for level in QUALITY_LEVELS]
+QUALITY_OVER_BUDGET = 0.9  # Step down when frames use more than this share of the frame budget
+QUALITY_HEADROOM = 0.5  # Step up again only when they use less than this
+QUALITY_WINDOW = 60  # Frames averaged before each decision
+QUALITY_COOLDOWN = 180  # Frames to wait after a change before measuring again
+REWIND_SECONDS = 0  # Play a windowed game keeps snapshots of, for rewinding (a practice aid, off by default)
+REWIND_STEP = 2  # Seconds one press of Backspace rewinds
+KEYFRAME_INTERVAL = FPS  # Rewind snapshots stored whole; the rest are deltas against them
+HUD_SIZE = (400, 280)  # Area the cached HUD covers (score, coins, lives, speed, power-ups)
+MAX_SPRITES = 256
+MAX_TEXT_SURFACES = 256
+SPRITE_PAD = 12
 
 # Colors
 WHITE = (255, 255, 255)
@@ -30,38 +116,557 @@ BROWN = (139, 69, 19)
 GRAY = (128, 128, 128)
 GOLD = (255, 215, 0)
 
-# Game States
-MENU = 0
-PLAYING = 1
-GAME_OVER = 2
-PAUSED = 3
-
-class Particle:
-    def __init__(self, x, y, color, velocity_x=0, velocity_y=0, life=60):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.velocity_x = velocity_x
-        self.velocity_y = velocity_y
-        self.life = life
-        self.max_life = life
-        self.size = random.randint(2, 5)
+# Player actions (shared by keyboard, scripted and programmatic input)
+ACTION_JUMP = "jump"
+ACTION_SLIDE = "slide"
+ACTION_LEFT = "left"
+ACTION_RIGHT = "right"
+ACTIONS = [ACTION_JUMP, ACTION_SLIDE, ACTION_LEFT, ACTION_RIGHT]
+
+VERTICAL_ACTIONS = (ACTION_JUMP, ACTION_SLIDE)
+
+# Presses the player cannot act on yet (mid-jump, mid-switch) wait this long
+# for the first simulation step where they can
+INPUT_BUFFER_MS = 150
+ALLOWED_EVENTS = [pygame.QUIT, pygame.KEYDOWN, pygame.WINDOWEXPOSED]
+
+# Autopilot search: time per simulation step, how far ahead a plan must
+# reach, and how often (in frames) it can choose an action
+AUTOPILOT_BUDGET_MS = 4.0
+AUTOPILOT_HORIZON = 3 * FPS
+AUTOPILOT_SEGMENT = 6
+AUTOPILOT_CHOICES = [None] + ACTIONS  # In order of preference when the outcomes tie
+
+KEY_ACTIONS = {
+    pygame.K_SPACE: ACTION_JUMP,
+    pygame.K_UP: ACTION_JUMP,
+    pygame.K_DOWN: ACTION_SLIDE,
+    pygame.K_LEFT: ACTION_LEFT,
+    pygame.K_RIGHT: ACTION_RIGHT
+}
+
+class ParticleSystem:
+    # Fixed-capacity particle pool stored as NumPy columns. Live particles are
+    # kept packed at the front of the arrays so update and draw are batched.
+    def __init__(self, capacity=MAX_PARTICLES, life=60):
+        self.capacity = capacity
+        self.life_span = life
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.velocity_x = np.zeros(capacity, dtype=np.float32)
+        self.velocity_y = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int16)
+        self.size = np.zeros(capacity, dtype=np.int8)
+        self.color = np.zeros(capacity, dtype=np.uint8)
+        
+        # Colors are stored as palette indices; one pre-rendered dot per color and size
+        self.palette = {}
+        self.colors = []
+        self.sprites = {}
+        self.rng = np.random.default_rng()
+    
+    def color_index(self, color):
+        index = self.palette.get(color)
+        if index is None:
+            index = len(self.colors)
+            self.palette[color] = index
+            self.colors.append(color)
+        return index
+    
+    def emit(self, x, y, color, count):
+        # When full, the oldest particles are dropped to make room
+        count = min(count, self.capacity)
+        overflow = self.count + count - self.capacity
+        if overflow > 0:
+            self.discard_oldest(overflow)
+        
+        start = self.count
+        end = start + count
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.velocity_x[start:end] = self.rng.uniform(-3, 3, count)
+        self.velocity_y[start:end] = self.rng.uniform(-5, -1, count)
+        self.life[start:end] = self.life_span
+        self.size[start:end] = self.rng.integers(2, 6, count)
+        self.color[start:end] = self.color_index(color)
+        self.count = end
+    
+    def discard_oldest(self, n):
+        keep = slice(n, self.count)
+        remaining = self.count - n
+        for column in (self.x, self.y, self.velocity_x, self.velocity_y, self.life, self.size, self.color):
+            column[:remaining] = column[keep]
+        self.count = remaining
     
     def update(self):
-        self.x += self.velocity_x
-        self.y += self.velocity_y
-        self.velocity_y += 0.1  # Gravity
-        self.life -= 1
+        n = self.count
+        if n == 0:
+            return
+        
+        self.x[:n] += self.velocity_x[:n]
+        self.y[:n] += self.velocity_y[:n]
+        self.velocity_y[:n] += 0.1  # Gravity
+        self.life[:n] -= 1
+        
+        # Compact the survivors to the front only when something died
+        alive = self.life[:n] > 0
+        if not alive.all():
+            keep = np.flatnonzero(alive)
+            for column in (self.x, self.y, self.velocity_x, self.velocity_y, self.life, self.size, self.color):
+                column[:len(keep)] = column[keep]
+            self.count = len(keep)
+    
+    def clear(self):
+        self.count = 0
+    
+    def __len__(self):
+        return self.count
+    
+    def get_sprite(self, color_index, size, scale=1.0):
+        key = (color_index, size, scale)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            radius = max(round(size * scale), 1)
+            sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, self.colors[color_index], (radius, radius), radius)
+            self.sprites[key] = sprite
+        return sprite
+    
+    def draw(self, screen, dirty=None, scale=1.0):
+        # Pass a list as dirty to collect the rects that were drawn; positions
+        # and sizes are multiplied by scale when drawing at a lower resolution
+        n = self.count
+        if n == 0:
+            return
+        
+        # One blits() call for the whole batch
+        sizes = self.size[:n].tolist()
+        left = self.x[:n] - self.size[:n]
+        top = self.y[:n] - self.size[:n]
+        if scale != 1.0:
+            left *= scale
+            top *= scale
+        left = left.astype(np.int32).tolist()
+        top = top.astype(np.int32).tolist()
+        get_sprite = self.get_sprite
+        rects = screen.blits([(get_sprite(c, r, scale), (px, py))
+                              for c, r, px, py in zip(self.color[:n].tolist(), sizes, left, top)],
+                             doreturn=dirty is not None)
+        if dirty is not None:
+            dirty.extend(rects)
+
+class SpriteCache:
+    # Renders each visual variant once into a Surface and reuses it. Keys
+    # identify the variant (kind, type, size, state); the least recently used
+    # surface is evicted once the cache holds max_size entries. Sprites for a
+    # lower render scale are smoothscaled from the full-size one.
+    def __init__(self, max_size=MAX_SPRITES):
+        self.max_size = max_size
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key, width, height, render, pad=SPRITE_PAD, scale=1.0):
+        cache_key = key if scale == 1.0 else (key, scale)
+        sprite = self.sprites.get(cache_key)
+        if sprite is not None:
+            self.sprites.move_to_end(cache_key)
+            self.hits += 1
+            return sprite
+        
+        self.misses += 1
+        if scale == 1.0:
+            sprite = pygame.Surface((width + pad * 2, height + pad * 2), pygame.SRCALPHA)
+            render(sprite, pygame.Rect(pad, pad, width, height))
+        else:
+            full = self.get(key, width, height, render, pad)
+            size = (max(round(full.get_width() * scale), 1), max(round(full.get_height() * scale), 1))
+            sprite = pygame.transform.smoothscale(full, size)
+        if pygame.display.get_surface() is not None:
+            sprite = sprite.convert_alpha()
+        
+        self.sprites[cache_key] = sprite
+        if len(self.sprites) > self.max_size:
+            self.sprites.popitem(last=False)
+        return sprite
+    
+    def blit(self, screen, key, rect, render, pad=SPRITE_PAD, scale=1.0):
+        sprite = self.get(key, rect.width, rect.height, render, pad, scale)
+        if scale == 1.0:
+            return screen.blit(sprite, (rect.x - pad, rect.y - pad))
+        return screen.blit(sprite, (int((rect.x - pad) * scale), int((rect.y - pad) * scale)))
+    
+    def clear(self):
+        self.sprites.clear()
+
+SPRITES = SpriteCache()
+
+# Columns of an EntityStore. direction is only set for moving obstacles, and
+# born (the frame an entity spawned) drives the collectible float animation.
+ENTITY_COLUMNS = [
+    ("x", np.float64), ("y", np.float64), ("prev_x", np.float64), ("prev_y", np.float64),
+    ("width", np.int32), ("height", np.int32), ("type", np.int8), ("direction", np.int8),
+    ("lane", np.int8), ("born", np.int64)
+]
+NO_ENTITIES = np.zeros(0, dtype=np.intp)
+# Up to this many rows, the per-frame passes loop over the rows in Python:
+# a run rarely has more than a few entities on screen, and each NumPy call
+# costs more than a short loop does. Crowded stores use the column operations.
+SCALAR_ENTITIES = 8
+
+class EntityStore:
+    # Live obstacles or collectibles as NumPy columns, one row per entity in
+    # spawn order, so each per-frame pass is a handful of array operations
+    # however many entities there are (or a plain loop, for SCALAR_ENTITIES
+    # or fewer). Per-type constants (size, spawn height, sprite) live on one
+    # prototype instance per type, indexed by the type column.
+    def __init__(self, prototypes, capacity=64):
+        self.prototypes = prototypes
+        self.type_names = [prototype.type for prototype in prototypes]
+        self.type_ids = {name: i for i, name in enumerate(self.type_names)}
+        self.max_width = max(prototype.width for prototype in prototypes)
+        self.min_width = min(prototype.width for prototype in prototypes)
+        self.count = 0
+        self.moving = 0  # Rows with a nonzero direction
+        # No x is below left, which moves with the entities (and their drift),
+        # so most steps know nothing needs dropping without scanning x
+        self.left = math.inf
+        self.high_water = 0
+        self.grows = 0
+        self.allocate(capacity)
+    
+    def allocate(self, capacity):
+        # (Re)allocate every column, keeping the live rows
+        columns = {}
+        for name, dtype in ENTITY_COLUMNS:
+            column = np.zeros(capacity, dtype=dtype)
+            if self.count:
+                column[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, column)
+            columns[name] = column
+        self.columns = list(columns.values())
+        # The same columns as flat bytes, for copying rows in and out in one go (snapshots)
+        self.column_bytes = [memoryview(column).cast("B") for column in self.columns]
+        self.capacity = capacity
+    
+    def add(self, x, entity_type, lane, direction=0, frame=0):
+        i = self.count
+        if i == self.capacity:
+            self.allocate(self.capacity * 2)
+            self.grows += 1
+        type_id = self.type_ids[entity_type]
+        prototype = self.prototypes[type_id]
+        self.x[i] = self.prev_x[i] = x
+        if x < self.left:
+            self.left = x
+        self.y[i] = self.prev_y[i] = prototype.y
+        self.width[i] = prototype.width
+        self.height[i] = prototype.height
+        self.type[i] = type_id
+        self.direction[i] = direction
+        self.lane[i] = lane
+        self.born[i] = frame
+        if direction:
+            self.moving += 1
+        self.count = i + 1
+        if self.count > self.high_water:
+            self.high_water = self.count
+        return i
+    
+    def compact(self, keep):
+        # Drop the rows where keep is False, preserving spawn order
+        n = self.count
+        remaining = int(np.count_nonzero(keep))
+        for column in self.columns:
+            column[:remaining] = column[:n][keep]
+        self.count = remaining
+        if self.moving:
+            self.moving = int(np.count_nonzero(self.direction[:remaining]))
+    
+    def remove(self, indices):
+        keep = np.ones(self.count, dtype=bool)
+        keep[indices] = False
+        self.compact(keep)
+    
+    def clear(self):
+        self.count = 0
+        self.moving = 0
+        self.left = math.inf
+    
+    def dump(self, out):
+        # Append the live rows to out, column by column
+        n = self.count
+        for column, raw in zip(self.columns, self.column_bytes):
+            out += raw[:n * column.itemsize]
+    
+    def load(self, data, pos, count):
+        # Replace the live rows with count rows written by dump() at data[pos:];
+        # returns the position after them
+        if count > self.capacity:
+            self.clear()
+            self.allocate(max(count, self.capacity * 2))
+        for column, raw in zip(self.columns, self.column_bytes):
+            size = count * column.itemsize
+            raw[:size] = data[pos:pos + size]
+            pos += size
+        self.count = count
+        self.moving = int(np.count_nonzero(self.direction[:count]))
+        self.left = -math.inf
+        self.high_water = max(self.high_water, count)
+        return pos
+    
+    def drop_left_of(self, min_x):
+        if self.left >= min_x:
+            return
+        x = self.x[:self.count]
+        self.left = float(np.minimum.reduce(x))
+        if self.left < min_x:
+            self.compact(x >= min_x)
+            self.left = min_x
+    
+    def overlapping(self, rect):
+        # Indices of entities whose box overlaps rect, with the same integer
+        # truncation as pygame.Rect(x, y - height, width, height).colliderect.
+        # The broad phase keeps anything whose x is within reach of rect (one
+        # pixel wider to allow for truncation); usually that is nothing.
+        n = self.count
+        if not n:
+            return NO_ENTITIES
+        low = rect.left - self.max_width - 1
+        high = rect.right + 1
+        if n <= SCALAR_ENTITIES:
+            return self.overlapping_rows(rect, low, high)
+        distance = self.x[:n] - (low + high) * 0.5
+        candidates = (np.abs(distance, out=distance) < (high - low) * 0.5).nonzero()[0]
+        if not len(candidates):
+            return candidates
+        x = self.x[candidates].astype(np.int64)
+        width = self.width[candidates]
+        height = self.height[candidates]
+        y = (self.y[candidates] - height).astype(np.int64)
+        return candidates[(x < rect.right) & (x + width > rect.left) & (y < rect.bottom) & (y + height > rect.top)]
+    
+    def overlapping_rows(self, rect, low, high):
+        # overlapping() one row at a time
+        hits = None
+        x_column = self.x
+        for i in range(self.count):
+            x = x_column.item(i)
+            if low < x < high:
+                height = self.height.item(i)
+                left = int(x)
+                top = int(self.y.item(i) - height)
+                if (left < rect.right and left + self.width.item(i) > rect.left
+                        and top < rect.bottom and top + height > rect.top):
+                    if hits is None:
+                        hits = []
+                    hits.append(i)
+        return NO_ENTITIES if hits is None else np.array(hits, dtype=np.intp)
+    
+    def swept(self, rect, prev_left, prev_top):
+        # Indices of entities that hit rect somewhere between the last step
+        # and this one although neither end of the step overlaps it: they went
+        # all the way across it in x. Those few are tested over the whole step
+        # (relative motion on both axes, truncated like overlapping()); rect
+        # moves from (prev_left, prev_top) to where it is now.
+        n = self.count
+        if not n:
+            return NO_ENTITIES
+        width = self.width[:n]
+        start = self.prev_x[:n].astype(np.int64) - int(prev_left)
+        end = self.x[:n].astype(np.int64) - rect.left
+        crossed = ((start >= rect.width) & (end + width <= 0)) | ((start + width <= 0) & (end >= rect.width))
+        candidates = crossed.nonzero()[0]
+        if not len(candidates):
+            return candidates
         
-        # Fade out
-        alpha = int(255 * (self.life / self.max_life))
-        self.color = (*self.color[:3], alpha)
+        # Fractions of the step during which the boxes overlap in x...
+        width = width[candidates]
+        start = start[candidates]
+        moved = end[candidates] - start
+        enter_x = np.minimum((rect.width - start) / moved, (-width - start) / moved)
+        leave_x = np.maximum((rect.width - start) / moved, (-width - start) / moved)
         
-        return self.life > 0
+        # ...and in y, where either side may not have moved at all
+        height = self.height[candidates]
+        top = (self.prev_y[candidates] - height).astype(np.int64) - int(prev_top)
+        moved = (self.y[candidates] - height).astype(np.int64) - rect.top - top
+        inside = (top > -height) & (top < rect.height)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            first = (rect.height - top) / moved
+            second = (-height - top) / moved
+        still = moved == 0
+        enter_y = np.where(still, np.where(inside, -np.inf, np.inf), np.minimum(first, second))
+        leave_y = np.where(still, np.where(inside, np.inf, -np.inf), np.maximum(first, second))
+        
+        enter = np.maximum(np.maximum(enter_x, enter_y), 0.0)
+        leave = np.minimum(np.minimum(leave_x, leave_y), 1.0)
+        return candidates[enter < leave]
+    
+    def colliding(self, rect, prev_left, prev_top, step):
+        # overlapping(rect), plus swept() once entities can move further past
+        # rect in one step than an entity's width plus rect's, so a discrete
+        # test could miss them: step (how far they scroll), their own drift,
+        # and however far rect itself moved sideways
+        hits = self.overlapping(rect)
+        if step + self.drift + abs(rect.left - int(prev_left)) < self.min_width + rect.width:
+            return hits
+        return np.union1d(hits, self.swept(rect, prev_left, prev_top))
+    
+    def type_name(self, i):
+        return self.type_names[self.type[i]]
+    
+    def stats(self):
+        return {"in_use": self.count, "capacity": self.capacity, "high_water": self.high_water, "grows": self.grows}
+    
+    def __len__(self):
+        return self.count
+    
+    def draw(self, screen, alpha=1.0, dirty=None, y_offsets=None, scale=1.0):
+        # One blits() call for all entities; rects are added to dirty if given
+        n = self.count
+        if not n:
+            return
+        if alpha < 1.0:
+            prev_x = self.prev_x[:n]
+            prev_y = self.prev_y[:n]
+            x = prev_x + (self.x[:n] - prev_x) * alpha
+            y = prev_y + (self.y[:n] - prev_y) * alpha
+        else:
+            x = self.x[:n]
+            y = self.y[:n]
+        left = x.astype(np.int64) - SPRITE_PAD
+        top = (y - self.height[:n]).astype(np.int64) - SPRITE_PAD
+        if y_offsets is not None:
+            top += y_offsets
+        if scale != 1.0:
+            left = (left * scale).astype(np.int64)
+            top = (top * scale).astype(np.int64)
+        
+        sprites = [SPRITES.get(p.sprite_key, p.width, p.height, p.render, scale=scale) for p in self.prototypes]
+        rects = screen.blits([(sprites[t], (sx, sy)) for t, sx, sy in zip(self.type[:n].tolist(), left.tolist(), top.tolist())],
+                             dirty is not None)
+        if dirty is not None:
+            dirty.extend(rects)
+
+class ObstacleStore(EntityStore):
+    drift = 2  # Moving obstacles move this far per step on top of the scroll
+    
+    def advance(self, game_speed, min_x):
+        # Scroll, move and bounce every obstacle, then drop those past min_x.
+        # direction is 0 for everything but moving obstacles.
+        n = self.count
+        if not n:
+            return
+        if n <= SCALAR_ENTITIES:
+            self.advance_rows(game_speed)
+            self.drop_left_of(min_x)
+            return
+        x = self.x[:n]
+        self.prev_x[:n] = x
+        x -= game_speed
+        self.left -= game_speed
+        if self.moving:
+            direction = self.direction[:n]
+            x += direction * 2
+            bounce = (x <= 0) | (x >= SCREEN_WIDTH - self.width[:n])
+            np.negative(direction, out=direction, where=bounce)
+            self.left -= self.drift
+        self.drop_left_of(min_x)
+    
+    def advance_rows(self, game_speed):
+        # advance() one row at a time, without the drop
+        x_column, prev_x, direction_column = self.x, self.prev_x, self.direction
+        moving = self.moving
+        for i in range(self.count):
+            x = x_column.item(i)
+            prev_x[i] = x
+            x -= game_speed
+            if moving:
+                direction = direction_column.item(i)
+                if direction:
+                    x += direction * 2
+                    if x <= 0 or x >= SCREEN_WIDTH - self.width.item(i):
+                        direction_column[i] = -direction
+            x_column[i] = x
+        self.left -= game_speed
+        if moving:
+            self.left -= self.drift
+
+class CollectibleStore(EntityStore):
+    drift = MAGNET_RADIUS * MAGNET_STRENGTH  # Furthest the magnet pulls in one step
+    
+    def __init__(self, prototypes, capacity=64):
+        super().__init__(prototypes, capacity)
+        self.magnetic = np.array([prototype.type in ("coin", "gem") for prototype in prototypes])
+        self.y_moved = False  # prev_y only needs refreshing after the magnet moved something
+    
+    def advance(self, game_speed, min_x):
+        n = self.count
+        if not n:
+            return
+        if self.y_moved:
+            self.prev_y[:n] = self.y[:n]
+            self.y_moved = False
+        if n <= SCALAR_ENTITIES:
+            x_column, prev_x = self.x, self.prev_x
+            for i in range(n):
+                x = x_column.item(i)
+                prev_x[i] = x
+                x_column[i] = x - game_speed
+            self.left -= game_speed
+            self.drop_left_of(min_x)
+            return
+        x = self.x[:n]
+        self.prev_x[:n] = x
+        x -= game_speed
+        self.left -= game_speed
+        self.drop_left_of(min_x)
     
-    def draw(self, screen):
-        if self.life > 0:
-            pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.size)
+    def attract(self, target_x, target_y, radius, strength):
+        # Pull coins and gems within radius of the target a fraction closer
+        n = self.count
+        if not n:
+            return
+        if n <= SCALAR_ENTITIES:
+            x_column, y_column = self.x, self.y
+            for i in range(n):
+                if self.magnetic[self.type.item(i)]:
+                    dx = target_x - x_column.item(i)
+                    dy = target_y - y_column.item(i)
+                    if math.sqrt(dx * dx + dy * dy) < radius:
+                        x_column[i] += dx * strength
+                        y_column[i] += dy * strength
+            self.left -= self.drift
+            self.y_moved = True
+            return
+        x = self.x[:n]
+        y = self.y[:n]
+        dx = target_x - x
+        dy = target_y - y
+        near = np.sqrt(dx * dx + dy * dy) < radius
+        near &= self.magnetic[self.type[:n]]
+        np.add(x, dx * strength, out=x, where=near)
+        np.add(y, dy * strength, out=y, where=near)
+        self.left -= self.drift
+        self.y_moved = True
+    
+    def draw(self, screen, alpha=1.0, dirty=None, frame=0, scale=1.0):
+        # Animation frames count the updates since each collectible spawned;
+        # pass frame=None to draw them without the float animation
+        n = self.count
+        if n:
+            y_offsets = None if frame is None else FLOAT_STEPS[(frame + 1 - self.born[:n]) % len(FLOAT_STEPS)]
+            super().draw(screen, alpha, dirty, y_offsets, scale)
+
+def interpolate(previous, current, alpha):
+    # Position between the last two simulation steps for smooth rendering
+    return previous + (current - previous) * alpha
+
+# Collectible float animation in whole pixels, one entry per animation frame
+# (rounded half away from zero, as pygame does when offsetting a Rect)
+FLOAT_STEPS = np.floor(np.array([math.sin(frame * 0.1) * 3 for frame in range(60)]) + 0.5).astype(np.int64)
 
 class Player:
     def __init__(self):
@@ -81,8 +686,13 @@ class Player:
         self.invincible_timer = 0
         self.target_x = self.x
         self.moving = False
+        self.prev_x = self.x
+        self.prev_y = self.y
         
     def update(self):
+        self.prev_x = self.x
+        self.prev_y = self.y
+        
         # Handle lane switching
         if self.moving:
             if abs(self.x - self.target_x) > 5:
@@ -143,38 +753,54 @@ class Player:
             self.target_x = LANES[self.lane]
             self.moving = True
     
+    def can(self, action):
+        # Whether the action would take effect right now
+        if action in VERTICAL_ACTIONS:
+            return not self.is_jumping and not self.is_sliding
+        if action == ACTION_LEFT:
+            return self.lane > 0 and not self.moving
+        return self.lane < 2 and not self.moving
+    
     def get_rect(self):
         return pygame.Rect(self.x - self.width // 2, self.y - self.height, self.width, self.height)
     
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0, scale=1.0):
         # Draw player as animated rectangle (placeholder for sprite)
         color = BLUE
         if self.invincible:
             # Flash effect during invincibility
             color = YELLOW if (self.invincible_timer // 5) % 2 == 0 else BLUE
+        legs = self.animation_frame < 2
         
-        rect = self.get_rect()
-        pygame.draw.rect(screen, color, rect)
+        def render(surface, rect):
+            pygame.draw.rect(surface, color, rect)
+            
+            # Draw eyes
+            eye_size = 5
+            eye_y = rect.y + 15
+            pygame.draw.circle(surface, BLACK, (int(rect.x + 15), eye_y), eye_size)
+            pygame.draw.circle(surface, BLACK, (int(rect.x + 45), eye_y), eye_size)
+            
+            # Draw running animation lines
+            if legs:
+                pygame.draw.line(surface, BLACK, (rect.x + 10, rect.y + 50), (rect.x + 20, rect.y + 70), 3)
+                pygame.draw.line(surface, BLACK, (rect.x + 40, rect.y + 50), (rect.x + 50, rect.y + 70), 3)
         
-        # Draw eyes
-        eye_size = 5
-        eye_y = rect.y + 15
-        pygame.draw.circle(screen, BLACK, (int(rect.x + 15), eye_y), eye_size)
-        pygame.draw.circle(screen, BLACK, (int(rect.x + 45), eye_y), eye_size)
+        rect = self.get_rect()
+        if alpha < 1.0:
+            rect.x = int(interpolate(self.prev_x, self.x, alpha) - self.width // 2)
+            rect.y = int(interpolate(self.prev_y, self.y, alpha) - self.height)
         
-        # Draw running animation lines
-        if self.animation_frame < 2:
-            pygame.draw.line(screen, BLACK, (rect.x + 10, rect.y + 50), (rect.x + 20, rect.y + 70), 3)
-            pygame.draw.line(screen, BLACK, (rect.x + 40, rect.y + 50), (rect.x + 50, rect.y + 70), 3)
+        # Sliding legs reach below the shortened body, hence the larger pad
+        return SPRITES.blit(screen, ("player", self.width, self.height, color, legs), rect, render, pad=40, scale=scale)
 
 class Obstacle:
-    def __init__(self, x, y, obstacle_type):
-        self.x = x
-        self.y = y
+    # Constants and sprite of one obstacle type; live obstacles are rows of an ObstacleStore
+    def __init__(self, obstacle_type):
         self.type = obstacle_type
+        self.y = SCREEN_HEIGHT - 100
         self.width = 60
         self.height = 80
-        self.speed = 8
         
         if obstacle_type == "barrier":
             self.height = 100
@@ -189,45 +815,36 @@ class Obstacle:
             self.y = SCREEN_HEIGHT - 50
             self.color = BLACK
         elif obstacle_type == "moving":
-            self.direction = random.choice([-1, 1])
             self.color = RED
-    
-    def update(self, game_speed):
-        self.x -= game_speed
         
-        if self.type == "moving":
-            self.x += self.direction * 2
-            if self.x <= 0 or self.x >= SCREEN_WIDTH - self.width:
-                self.direction *= -1
+        self.set_detail(True)
     
-    def get_rect(self):
-        return pygame.Rect(self.x, self.y - self.height, self.width, self.height)
+    def set_detail(self, detail):
+        # Low detail leaves the spikes off barriers; both variants stay cached
+        self.detail = detail
+        self.sprite_key = ("obstacle", self.type, self.width, self.height, detail)
     
-    def draw(self, screen):
-        rect = self.get_rect()
-        pygame.draw.rect(screen, self.color, rect)
+    def render(self, surface, rect):
+        pygame.draw.rect(surface, self.color, rect)
         
         if self.type == "pit":
-            pygame.draw.rect(screen, BLACK, rect)
-        elif self.type == "barrier":
+            pygame.draw.rect(surface, BLACK, rect)
+        elif self.type == "barrier" and self.detail:
             # Draw spikes on top
             for i in range(0, self.width, 10):
-                pygame.draw.polygon(screen, BLACK, [
+                pygame.draw.polygon(surface, BLACK, [
                     (rect.x + i, rect.y),
                     (rect.x + i + 5, rect.y - 10),
                     (rect.x + i + 10, rect.y)
                 ])
 
 class Collectible:
-    def __init__(self, x, y, collectible_type):
-        self.x = x
-        self.y = y
+    # Constants and sprite of one collectible type; live collectibles are rows of a CollectibleStore
+    def __init__(self, collectible_type):
         self.type = collectible_type
+        self.y = SCREEN_HEIGHT - 200
         self.width = 20
         self.height = 20
-        self.speed = 8
-        self.animation_frame = 0
-        self.collected = False
         
         if collectible_type == "coin":
             self.color = GOLD
@@ -246,85 +863,131 @@ class Collectible:
         elif collectible_type == "invincibility":
             self.color = YELLOW
             self.value = 0
-    
-    def update(self, game_speed):
-        self.x -= game_speed
-        self.animation_frame = (self.animation_frame + 1) % 60
-    
-    def get_rect(self):
-        return pygame.Rect(self.x, self.y - self.height, self.width, self.height)
-    
-    def draw(self, screen):
-        if self.collected:
-            return
-            
-        rect = self.get_rect()
         
-        # Floating animation
-        offset = math.sin(self.animation_frame * 0.1) * 3
-        rect.y += offset
-        
-        pygame.draw.rect(screen, self.color, rect)
+        self.sprite_key = ("collectible", self.type, self.width, self.height)
+    
+    def render(self, surface, rect):
+        pygame.draw.rect(surface, self.color, rect)
         
         if self.type == "coin":
-            pygame.draw.circle(screen, GOLD, rect.center, 10)
-            pygame.draw.circle(screen, YELLOW, rect.center, 6)
+            pygame.draw.circle(surface, GOLD, rect.center, 10)
+            pygame.draw.circle(surface, YELLOW, rect.center, 6)
         elif self.type == "gem":
-            pygame.draw.polygon(screen, PURPLE, [
+            pygame.draw.polygon(surface, PURPLE, [
                 (rect.centerx, rect.y),
                 (rect.x + rect.width, rect.y + rect.height // 2),
                 (rect.centerx, rect.y + rect.height),
                 (rect.x, rect.y + rect.height // 2)
             ])
         elif self.type == "magnet":
-            pygame.draw.rect(screen, RED, rect)
-            pygame.draw.rect(screen, WHITE, (rect.x + 5, rect.y + 5, 10, 10))
+            pygame.draw.rect(surface, RED, rect)
+            pygame.draw.rect(surface, WHITE, (rect.x + 5, rect.y + 5, 10, 10))
         elif self.type == "speed":
-            pygame.draw.polygon(screen, GREEN, [
+            pygame.draw.polygon(surface, GREEN, [
                 (rect.x, rect.y + rect.height),
                 (rect.x + rect.width, rect.centery),
                 (rect.x, rect.y)
             ])
         elif self.type == "invincibility":
-            pygame.draw.circle(screen, YELLOW, rect.center, 12)
-            pygame.draw.circle(screen, ORANGE, rect.center, 8)
+            pygame.draw.circle(surface, YELLOW, rect.center, 12)
+            pygame.draw.circle(surface, ORANGE, rect.center, 8)
+
+class TextCache:
+    # LRU cache of rendered strings keyed by font, text and color. Glyphs for
+    # fast-changing numbers are cached one character at a time, so a new score
+    # is built by blitting cached digits instead of rendering a new string.
+    def __init__(self, max_size=MAX_TEXT_SURFACES):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+    
+    def blit_number(self, screen, font, label, number, color, pos):
+        # Label is cached as one surface, the number digit by digit
+        x, y = pos
+        surface = self.render(font, label, color)
+        screen.blit(surface, (x, y))
+        x += surface.get_width()
+        for char in str(number):
+            glyph = self.render(font, char, color)
+            screen.blit(glyph, (x, y))
+            x += glyph.get_width()
+        return pygame.Rect(pos[0], y, x - pos[0], surface.get_height())
+    
+    def clear(self):
+        self.surfaces.clear()
 
 class UI:
+    # Fonts are loaded on first use, so the menu only waits for the two it shows
     def __init__(self):
-        self.font = pygame.font.Font(None, 36)
-        self.big_font = pygame.font.Font(None, 72)
-        self.small_font = pygame.font.Font(None, 24)
+        self.fonts = {}
+        self.text = TextCache()
+        self.dim_overlay = None
+    
+    def load_font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+    
+    @property
+    def font(self):
+        return self.load_font(36)
+    
+    @property
+    def big_font(self):
+        return self.load_font(72)
+    
+    @property
+    def small_font(self):
+        return self.load_font(24)
     
     def draw_game_ui(self, screen, score, coins, lives, speed, powerups):
+        # Returns the bounding rect of everything drawn, for dirty-rect updates
         # Score
-        score_text = self.font.render(f"Score: {score}", True, WHITE)
-        screen.blit(score_text, (10, 10))
+        hud_rect = self.text.blit_number(screen, self.font, "Score: ", score, WHITE, (10, 10))
         
         # Coins
-        coin_text = self.font.render(f"Coins: {coins}", True, GOLD)
-        screen.blit(coin_text, (10, 50))
+        hud_rect.union_ip(self.text.blit_number(screen, self.font, "Coins: ", coins, GOLD, (10, 50)))
         
         # Lives
         for i in range(lives):
-            pygame.draw.circle(screen, RED, (10 + i * 30, 100), 10)
+            hud_rect.union_ip(pygame.draw.circle(screen, RED, (10 + i * 30, 100), 10))
         
         # Speed indicator
-        speed_text = self.small_font.render(f"Speed: {speed:.1f}", True, WHITE)
-        screen.blit(speed_text, (10, 120))
+        speed_text = self.text.render(self.small_font, f"Speed: {speed:.1f}", WHITE)
+        hud_rect.union_ip(screen.blit(speed_text, (10, 120)))
         
         # Power-up timers
         y_offset = 150
         for powerup, timer in powerups.items():
             if timer > 0:
-                text = self.small_font.render(f"{powerup}: {timer//60}s", True, WHITE)
-                screen.blit(text, (10, y_offset))
+                text = self.text.render(self.small_font, f"{powerup}: {timer//60}s", WHITE)
+                hud_rect.union_ip(screen.blit(text, (10, y_offset)))
                 y_offset += 25
+        
+        return hud_rect
     
-    def draw_menu(self, screen):
+    def draw_menu(self, screen, rewind=False):
         screen.fill(BLACK)
         
         # Title
-        title = self.big_font.render("TEMPLE RUN", True, GOLD)
+        title = self.text.render(self.big_font, "TEMPLE RUN", GOLD)
         title_rect = title.get_rect(center=(SCREEN_WIDTH // 2, 200))
         screen.blit(title, title_rect)
         
@@ -338,70 +1001,432 @@ class UI:
             "",
             "Press SPACE to start!"
         ]
+        if rewind:
+            instructions[4:4] = ["BACKSPACE: Rewind", "F5/F9: Save/Load state"]
         
         y_offset = 300
         for line in instructions:
-            text = self.font.render(line, True, WHITE)
+            text = self.text.render(self.font, line, WHITE)
             text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, y_offset))
             screen.blit(text, text_rect)
             y_offset += 40
     
+    def draw_dim(self, screen):
+        # Semi-transparent overlay, built once
+        if self.dim_overlay is None:
+            self.dim_overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            self.dim_overlay.set_alpha(128)
+            self.dim_overlay.fill(BLACK)
+        screen.blit(self.dim_overlay, (0, 0))
+    
+    def draw_pause(self, screen):
+        self.draw_dim(screen)
+        pause_text = self.text.render(self.big_font, "PAUSED", WHITE)
+        pause_rect = pause_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
+        screen.blit(pause_text, pause_rect)
+    
     def draw_game_over(self, screen, score, high_score):
-        # Semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill(BLACK)
-        screen.blit(overlay, (0, 0))
+        self.draw_dim(screen)
         
         # Game Over text
-        game_over = self.big_font.render("GAME OVER", True, RED)
+        game_over = self.text.render(self.big_font, "GAME OVER", RED)
         game_over_rect = game_over.get_rect(center=(SCREEN_WIDTH // 2, 300))
         screen.blit(game_over, game_over_rect)
         
         # Score
-        score_text = self.font.render(f"Final Score: {score}", True, WHITE)
+        score_text = self.text.render(self.font, f"Final Score: {score}", WHITE)
         score_rect = score_text.get_rect(center=(SCREEN_WIDTH // 2, 400))
         screen.blit(score_text, score_rect)
         
         # High score
-        high_score_text = self.font.render(f"High Score: {high_score}", True, GOLD)
+        high_score_text = self.text.render(self.font, f"High Score: {high_score}", GOLD)
         high_score_rect = high_score_text.get_rect(center=(SCREEN_WIDTH // 2, 450))
         screen.blit(high_score_text, high_score_rect)
         
         # Restart instruction
-        restart_text = self.font.render("Press SPACE to restart or ESC for menu", True, WHITE)
+        restart_text = self.text.render(self.font, "Press SPACE to restart or ESC for menu", WHITE)
         restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, 550))
         screen.blit(restart_text, restart_rect)
 
+class ScriptedInput:
+    # Plays back a fixed list of (frame, action) pairs in headless runs
+    def __init__(self, events):
+        self.events = {}
+        for frame, action in events:
+            self.events.setdefault(frame, []).append(action)
+    
+    def __call__(self, game, frame):
+        return self.events.get(frame, ())
+
+class RandomInput:
+    # Presses a random action on roughly `rate` of frames
+    def __init__(self, seed=None, rate=0.05):
+        self.rng = random.Random(seed)
+        self.rate = rate
+    
+    def __call__(self, game, frame):
+        if self.rng.random() < self.rate:
+            return (self.rng.choice(ACTIONS),)
+        return ()
+
+class Autopilot:
+    # Built-in AI player, called as inputs(game, frame) like RandomInput. It
+    # follows a plan of segments, each an action (or none) and then no-ops
+    # for `segment` frames in all, which a headless copy of the game has
+    # checked loses no life for `horizon` frames ahead. Each call extends the
+    # plan by depth-first search for up to budget_ms: every action the player
+    # can take at the end of the plan is simulated for one segment, and the
+    # survivors are tried most points first, doing nothing before moving.
+    # When none survive, the search backs up to an earlier segment's next
+    # best choice; once nothing after the segment already under way
+    # survives, it settles for losing a life. Runs are deterministic, so a
+    # plan holds until the game leaves it: each finished segment is compared
+    # with the game's actual state and the plan is dropped if they differ.
+    def __init__(self, budget_ms=AUTOPILOT_BUDGET_MS, horizon=AUTOPILOT_HORIZON, segment=AUTOPILOT_SEGMENT,
+                 history=3600):
+        self.budget = budget_ms / 1000.0
+        self.horizon = horizon
+        self.segment = segment
+        
+        # Forward model, reset for the run being played (seed and tuning)
+        self.model = None
+        self.model_run = None
+        self.loaded = None  # Snapshot the model is known to be in
+        
+        self.plan = []  # [start frame, action, snapshot at the end, untried alternatives] per segment
+        self.root = None  # Snapshot the plan starts from, at root_frame
+        self.root_frame = -1
+        self.last_frame = -1
+        self.floor = 0  # Fewest lives a segment may end with
+        self.expanding = None  # (snapshot, actions left, children so far) of a partly searched slot
+        
+        self.nodes = 0  # Segments simulated
+        self.steps = 0
+        self.clones = 0  # Snapshots taken or restored
+        self.replans = 0
+        self.desyncs = 0
+        self.think_times = deque(maxlen=history)
+        self.lookahead = deque(maxlen=history)
+    
+    def __call__(self, game, frame):
+        start = time.perf_counter()
+        self.sync(game, frame)
+        self.search(frame, start + self.budget)
+        self.think_times.append(time.perf_counter() - start)
+        
+        plan = self.plan
+        self.lookahead.append(plan[-1][0] + self.segment - frame if plan else 0)
+        if plan and plan[0][0] == frame and plan[0][1]:
+            return (plan[0][1],)
+        return ()
+    
+    def sync(self, game, frame):
+        # Follow the game: new runs, finished segments, anything unexpected
+        run = (game.seed, game.segment_gap, game.collectible_rarity)
+        if self.model is None:
+            self.model = Game(headless=True, level_thread=False)
+        if run != self.model_run:
+            self.model.configure({key: getattr(game, key) for key in TUNING_KEYS})
+            self.model.reset_game(game.seed)
+            self.model.recorder = None
+            self.model_run = run
+            self.plan = []
+        self.model.swept_collisions = game.swept_collisions
+        if frame != self.last_frame + 1:
+            self.plan = []
+        self.last_frame = frame
+        
+        plan = self.plan
+        while plan and plan[0][0] + self.segment <= frame:
+            segment = plan.pop(0)
+            self.root = segment[2]
+            self.root_frame = frame
+            if game.save_state() != self.root:
+                self.desyncs += 1
+                self.root_frame = -1
+                plan.clear()
+                break
+        
+        if not plan and self.root_frame != frame:
+            self.root = game.save_state()
+            self.root_frame = frame
+            self.floor = game.lives
+            self.expanding = None
+            self.replans += 1
+    
+    def search(self, frame, deadline):
+        plan = self.plan
+        committed = 1 if plan and plan[0][0] < frame else 0
+        clock = time.perf_counter
+        while self.floor > 0 and clock() < deadline:
+            end = plan[-1][0] + self.segment if plan else self.root_frame
+            if end >= frame + self.horizon:
+                break
+            parent = plan[-1][2] if plan else self.root
+            
+            if self.expanding is None or self.expanding[0] is not parent:
+                self.load(parent)
+                player = self.model.player
+                self.expanding = (parent, [None] + [action for action in ACTIONS if player.can(action)], [])
+            _, actions, children = self.expanding
+            action = actions.pop(0)
+            children.append(self.simulate(parent, action))
+            if actions:
+                continue
+            
+            # Every choice for this slot is in: keep the survivors, best first
+            self.expanding = None
+            survivors = sorted(child for child in children if child[0])
+            if survivors:
+                _, _, _, action, snapshot = survivors[0]
+                plan.append([end, action, snapshot, survivors[1:]])
+                continue
+            
+            # Dead end: take the next alternative of the latest segment that has one
+            while len(plan) > committed and not plan[-1][3]:
+                plan.pop()
+            if len(plan) > committed:
+                _, _, _, plan[-1][1], plan[-1][2] = plan[-1][3].pop(0)
+            else:
+                self.floor -= 1
+    
+    def load(self, snapshot):
+        if self.loaded is not snapshot:
+            self.model.load_state(snapshot)
+            self.loaded = snapshot
+            self.clones += 1
+    
+    def simulate(self, parent, action):
+        # One segment from parent: (survived, -score, choice rank, action, snapshot),
+        # which sorts the way the search prefers
+        model = self.model
+        self.load(parent)
+        self.loaded = None
+        if action:
+            model.apply_action(action)
+        for _ in range(self.segment):
+            self.steps += 1
+            if not model.step():
+                break
+        self.nodes += 1
+        survived = model.state == PLAYING and model.lives >= self.floor
+        if not survived:
+            return (False, 0, 0, action, None)
+        self.clones += 1
+        return (True, -model.score, AUTOPILOT_CHOICES.index(action), action, model.save_state())
+    
+    def summary(self):
+        times = sorted(self.think_times)
+        result = {"nodes": self.nodes, "steps": self.steps, "clones": self.clones,
+                  "replans": self.replans, "desyncs": self.desyncs}
+        if times:
+            result["think_mean_ms"] = round(sum(times) / len(times) * 1000, 3)
+            result["think_p99_ms"] = round(times[min(int(len(times) * 0.99), len(times) - 1)] * 1000, 3)
+            result["think_max_ms"] = round(times[-1] * 1000, 3)
+            result["lookahead_frames"] = round(sum(self.lookahead) / len(self.lookahead), 1)
+        return result
+
+class InputBuffer:
+    # Keyboard actions waiting for the first simulation step where the player
+    # can perform them. Entries are (action, press time, press frame, last
+    # frame); a newer jump or slide replaces a waiting one, while lane
+    # switches queue up in order. A switch (~20 frames) outlasts the window,
+    # so a lane switch queued behind one only starts its window once the
+    # player stops moving. Latency is measured from when the event was read
+    # to the step that acted on it.
+    def __init__(self, window_ms=INPUT_BUFFER_MS, history=240):
+        self.window = max(int(round(window_ms / 1000.0 / SIM_DT)), 0)
+        self.pending = []
+        self.latencies = deque(maxlen=history)
+        self.applied = 0
+        self.buffered = 0  # Acted on after the first step that followed the press
+        self.expired = 0
+    
+    def push(self, action, stamp, frame):
+        if action in VERTICAL_ACTIONS:
+            self.pending = [entry for entry in self.pending if entry[0] not in VERTICAL_ACTIONS]
+        self.pending.append((action, stamp, frame, frame + self.window))
+    
+    def clear(self):
+        self.pending = []
+    
+    def apply(self, game):
+        # Called before each simulation step
+        if not self.pending:
+            return
+        player = game.player
+        frame = game.frame
+        now = time.perf_counter()
+        waiting = []
+        for entry in self.pending:
+            action, stamp, pressed, deadline = entry
+            if player.can(action):
+                game.apply_action(action)
+                self.latencies.append((now - stamp) * 1000)
+                self.applied += 1
+                if frame > pressed:
+                    self.buffered += 1
+            elif player.moving and action not in VERTICAL_ACTIONS:
+                waiting.append((action, stamp, pressed, frame + self.window))
+            elif frame < deadline:
+                waiting.append(entry)
+            else:
+                self.expired += 1
+        self.pending = waiting
+    
+    def summary(self):
+        latencies = sorted(self.latencies)
+        result = {"applied": self.applied, "buffered": self.buffered, "expired": self.expired}
+        if latencies:
+            result["mean_ms"] = round(sum(latencies) / len(latencies), 3)
+            result["p95_ms"] = round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 3)
+            result["max_ms"] = round(latencies[-1], 3)
+        return result
+
+class QualityGovernor:
+    # Picks a QUALITY_LEVELS index from how much of the frame budget recent
+    # frames used. The step-down and step-up thresholds are far apart and each
+    # change is followed by a cooldown, so it settles instead of oscillating.
+    def __init__(self, level=len(QUALITY_LEVELS) - 1, target_fps=FPS, window=QUALITY_WINDOW,
+                 cooldown=QUALITY_COOLDOWN):
+        self.level = level
+        self.budget = 1.0 / target_fps
+        self.window = window
+        self.cooldown = cooldown
+        self.total = 0.0
+        self.samples = 0
+        self.wait = cooldown
+    
+    def reset(self):
+        self.total = 0.0
+        self.samples = 0
+        self.wait = self.cooldown
+    
+    def update(self, busy_time):
+        # Feed one frame's busy time (seconds); returns True when the level changed
+        if self.wait > 0:
+            self.wait -= 1
+            return False
+        self.total += busy_time
+        self.samples += 1
+        if self.samples < self.window:
+            return False
+        
+        load = self.total / self.samples / self.budget
+        self.total = 0.0
+        self.samples = 0
+        if load > QUALITY_OVER_BUDGET and self.level > 0:
+            self.level -= 1
+        elif load < QUALITY_HEADROOM and self.level < len(QUALITY_LEVELS) - 1:
+            self.level += 1
+        else:
+            return False
+        self.wait = self.cooldown
+        return True
+
 class Game:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Temple Run Style Game")
-        self.clock = pygame.time.Clock()
+    def __init__(self, headless=False, dirty_rects=False, render_rate=FPS, seed=None, replay_dir=None,
+                 tuning=None, level_thread=None, leaderboard_path=LEADERBOARD_PATH, render_scale=1.0,
+                 quality="auto", input_buffer=INPUT_BUFFER_MS, rewind_seconds=REWIND_SECONDS, telemetry_dir=None):
+        # Headless games never open a window: no display, fonts, events or frame cap
+        self.headless = headless
+        
+        # Milliseconds since launch at each startup milestone
+        self.startup = {"import": (IMPORT_TIME - LAUNCH_TIME) * 1000}
+        self.report_startup = False
+        
+        # The track ahead is built from level segments, on a worker thread
+        # unless headless (batch runners already keep every core busy)
+        self.level_thread = not headless if level_thread is None else level_thread
+        self.level = None
+        
+        # Every run draws gameplay randomness from its own seeded stream so it
+        # can be replayed exactly; cosmetic effects use a separate stream
+        self.fixed_seed = None if seed is None else check_seed(seed)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.fx_rng = random.Random()
+        
+        # Keyboard actions wait in the buffer until the player can act on them
+        self.input = InputBuffer(input_buffer)
+        self.report_input = False
+        
+        # Built-in AI player; when set it plays instead of the keyboard and
+        # starts a new run as soon as one ends, for soak testing
+        self.autopilot = None
+        
+        # Input recording; finished runs are saved to replay_dir when set
+        self.replay_dir = replay_dir
+        self.recorder = None
+        self.last_replay = None
+        
+        # With rewind_seconds, windowed games snapshot every step of that much
+        # play (Backspace rewinds) and F5 and F9 save and load one state with
+        # its inputs. Runs that used either are assisted and stay off the
+        # leaderboard.
+        self.rewind = None if headless or not rewind_seconds else RewindBuffer(int(rewind_seconds * FPS), KEYFRAME_INTERVAL)
+        self.saved_state = None
+        self.assisted = False
+        
+        # Per-phase frame timings (F3 toggles the overlay, F4 records a trace)
+        self.profiler = FrameProfiler()
+        self.trace_path = None
+        
+        # Rendering runs at render_rate (0 for uncapped, or "vsync") while the
+        # simulation always advances in fixed SIM_DT steps
+        self.render_rate = render_rate
+        self.accumulator = 0.0
+        
+        # The world (background, entities, particles) is drawn at render_scale
+        # of the window resolution into an offscreen surface and presented with
+        # one scaled blit, which is also where screen shake is applied. The HUD
+        # is always drawn at full resolution on top.
+        if not 0 < render_scale <= 1:
+            raise ValueError("render_scale must be in (0, 1], got %r" % (render_scale,))
+        self.render_scale = render_scale
+        self.world_size = (int(SCREEN_WIDTH * render_scale), int(SCREEN_HEIGHT * render_scale))
+        
+        if headless:
+            self.screen = None
+            self.world = None
+            self.upscaled = None
+            self.clock = None
+        else:
+            init_pygame()
+            if render_rate == "vsync":
+                self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED, vsync=1)
+            else:
+                self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("Temple Run Style Game")
+            self.world = pygame.Surface(self.world_size).convert()
+            # Scratch target for scaling up a shaken frame before offsetting it
+            self.upscaled = None if render_scale == 1.0 else self.screen.copy()
+            self.clock = pygame.time.Clock()
+            self.mark_startup("window")
         
         self.state = MENU
         self.player = Player()
-        self.obstacles = []
-        self.collectibles = []
-        self.particles = []
-        self.ui = UI()
+        self.obstacles = ObstacleStore([Obstacle(obstacle_type) for obstacle_type in OBSTACLE_TYPES])
+        self.collectibles = CollectibleStore([Collectible(collectible_type) for collectible_type in COLLECTIBLE_TYPES])
+        self.particles = ParticleSystem()
+        self.ui = None if headless else UI()
         
         self.score = 0
         self.coins = 0
         self.lives = 3
-        self.game_speed = 8
-        self.base_speed = 8
+        # Balance parameters (see configure)
+        self.start_speed = START_SPEED
+        self.segment_gap = SEGMENT_GAP
+        self.collectible_rarity = COLLECTIBLE_RARITY
+        if tuning:
+            self.configure(tuning)
+        
+        self.game_speed = self.start_speed
+        self.base_speed = self.start_speed
         self.distance = 0
-        self.spawn_timer = 0
-        self.collectible_timer = 0
         
         # Power-ups
-        self.powerups = {
-            "magnet": 0,
-            "speed": 0,
-            "invincibility": 0,
-            "double_coins": 0
-        }
+        self.powerups = dict.fromkeys(POWERUPS, 0)
         
         # Background layers for parallax
         self.bg_layers = [
@@ -410,126 +1435,261 @@ class Game:
             {"x": 0, "speed": 6, "color": (90, 90, 140)}
         ]
         
-        # High score
-        self.high_score = self.load_high_score()
+        # Detail level: one of QUALITY_NAMES, or "auto" to start high and let
+        # the governor follow measured frame times (windowed games only)
+        self.governor = None
+        if quality == "auto":
+            quality = "high"
+            if not headless:
+                self.governor = QualityGovernor(QUALITY_NAMES.index(quality),
+                                                render_rate if render_rate and render_rate != "vsync" else FPS)
+        self.hud_layer = None
+        self.hud_age = 0
+        self.set_quality(QUALITY_NAMES.index(quality))
+        
+        # Pre-rendered background and dirty-rect bookkeeping. A scaled world is
+        # presented whole every frame, so dirty rects only apply at full scale.
+        self.dirty_mode = dirty_rects and not headless and render_scale == 1.0
+        self.prev_rects = []
+        self.dirty_rects = None
+        self.needs_full_redraw = True
+        
+        # Paused and game-over screens are stills: the scene is captured once
+        # and the overlay composed onto it again only when frozen_key changes
+        self.frozen_scene = None
+        self.frozen = False
+        self.frozen_key = None
+        
+        # Assets the menu does not need are built one per frame while it is
+        # showing; draw_game finishes whatever is left before gameplay starts
+        self.bg_strips = []
+        self.pending_assets = deque() if headless else deque([
+            lambda: self.ui.small_font,
+            self.bake_background,
+            self.warm_sprites
+        ])
+        
+        # Finished runs go to the leaderboard, which loads and saves on its own
+        # thread (headless runs never touch it)
+        self.leaderboard = None if headless or not leaderboard_path else Leaderboard(leaderboard_path)
+        self.high_score = 0
+        
+        # Gameplay events (hits, pickups, power-ups, combos, state changes) go
+        # to a binary log in telemetry_dir, written on its own thread
+        self.telemetry = Telemetry(telemetry_dir) if telemetry_dir else None
         
         # Screen shake
         self.screen_shake = 0
         
+        # Sweep collisions at speeds where the overlap test could miss (the
+        # tunneling tests in tests/test_collisions.py turn it off for comparison)
+        self.swept_collisions = True
+        
         # Combo system
         self.combo = 0
         self.combo_timer = 0
         
-    def load_high_score(self):
-        try:
-            with open("high_score.json", "r") as f:
-                data = json.load(f)
-                return data.get("high_score", 0)
-        except:
-            return 0
-    
-    def save_high_score(self):
-        try:
-            with open("high_score.json", "w") as f:
-                json.dump({"high_score": self.high_score}, f)
-        except:
-            pass
-    
-    def reset_game(self):
+        # Run statistics for balance analysis
+        self.death_cause = None
+        self.powerup_frames = dict.fromkeys(self.powerups, 0)
+        
+        # Simulated frames since the last reset
+        self.frame = 0
+        
+        if headless:
+            self.state = PLAYING
+            self.reset_game()
+        
+    def record_run(self):
+        # A rewound run counts for neither the high score nor the leaderboard,
+        # but still picks up what other runs put on the leaderboard
+        if not self.assisted:
+            if self.score > self.high_score:
+                self.high_score = self.score
+            if self.leaderboard:
+                self.leaderboard.submit(self.score, self.distance, self.coins, self.seed, self.frame,
+                                        self.frame * SIM_DT)
+        if self.leaderboard:
+            self.high_score = max(self.high_score, self.leaderboard.high_score)
+    
+    def mark_startup(self, milestone):
+        if milestone not in self.startup:
+            self.startup[milestone] = (time.perf_counter() - LAUNCH_TIME) * 1000
+            if milestone == "assets" and self.report_startup:
+                print(json.dumps({"startup_ms": {name: round(ms, 2) for name, ms in self.startup.items()}}))
+    
+    def load_assets(self, steps=None):
+        # Run up to steps pending asset loads (all of them by default)
+        pending = self.pending_assets
+        while pending and steps != 0:
+            pending.popleft()()
+            if steps:
+                steps -= 1
+        if not pending:
+            self.mark_startup("assets")
+    
+    def warm_sprites(self):
+        # Pre-render every obstacle and collectible sprite
+        for prototype in self.obstacles.prototypes + self.collectibles.prototypes:
+            SPRITES.get(prototype.sprite_key, prototype.width, prototype.height, prototype.render, scale=self.render_scale)
+    
+    def set_quality(self, level):
+        # Switch to a QUALITY_LEVELS entry; only cosmetic settings change
+        self.quality_level = level
+        self.quality = QUALITY_LEVELS[level]
+        for prototype in self.obstacles.prototypes:
+            prototype.set_detail(self.quality["spikes"])
+        self.hud_age = 0
+        self.profiler.labels["quality"] = self.quality["name"]
+        self.invalidate()
+    
+    def configure(self, tuning):
+        # Override balance parameters; takes effect from the next reset_game
+        for key, value in tuning.items():
+            if key not in TUNING_KEYS:
+                raise ValueError("Unknown tuning parameter: %s" % key)
+            setattr(self, key, value)
+    
+    def reset_game(self, seed=None):
+        # Without an explicit or fixed seed each run gets a fresh one
+        if seed is None:
+            seed = self.fixed_seed if self.fixed_seed is not None else random.getrandbits(32)
+        self.seed = check_seed(seed)
+        self.rng.seed(seed)
+        self.recorder = ReplayRecorder(seed)
+        if self.level:
+            self.level.close()
+        self.level = LevelStream(LEVEL_LIBRARY, self.rng.getrandbits(32), LEVEL_MIN_GAP,
+                                 self.segment_gap, self.collectible_rarity, self.level_thread,
+                                 LEVEL_SPEED, self.level_speed(self.start_speed))
+        
         self.player = Player()
-        self.obstacles = []
-        self.collectibles = []
-        self.particles = []
+        self.obstacles.clear()
+        self.collectibles.clear()
+        self.particles.clear()
         self.score = 0
         self.coins = 0
         self.lives = 3
+        self.base_speed = self.start_speed
         self.game_speed = self.base_speed
         self.distance = 0
-        self.spawn_timer = 0
-        self.collectible_timer = 0
-        self.powerups = {
-            "magnet": 0,
-            "speed": 0,
-            "invincibility": 0,
-            "double_coins": 0
-        }
+        self.powerups = dict.fromkeys(POWERUPS, 0)
         self.screen_shake = 0
         self.combo = 0
         self.combo_timer = 0
+        self.death_cause = None
+        self.powerup_frames = dict.fromkeys(self.powerups, 0)
+        self.frame = 0
+        self.accumulator = 0.0
+        self.input.clear()
+        if self.rewind is not None:
+            self.rewind.clear()
+        self.assisted = False
+        # The first frames of a run include asset loading, so measuring starts over
+        if self.governor:
+            self.governor.reset()
+        if self.telemetry:
+            self.telemetry.begin_run()
+            self.log_event(EVENT_RUN_START, value=seed)
     
-    def spawn_obstacle(self):
-        if self.spawn_timer <= 0:
-            lane = random.randint(0, 2)
-            x = LANES[lane]
-            y = SCREEN_HEIGHT - 100
-            
-            obstacle_types = ["barrier", "low", "pit", "moving"]
-            obstacle_type = random.choice(obstacle_types)
-            
-            if obstacle_type == "pit":
-                x = LANES[lane] - 60
-            
-            self.obstacles.append(Obstacle(x, y, obstacle_type))
-            self.spawn_timer = random.randint(60, 120)
-        else:
-            self.spawn_timer -= 1
+    def log_event(self, event, subject=0, value=0):
+        self.telemetry.log(event, self.frame, subject, self.player.lane, self.lives, self.distance, value, self.score)
     
-    def spawn_collectible(self):
-        if self.collectible_timer <= 0:
-            lane = random.randint(0, 2)
-            x = LANES[lane]
-            y = SCREEN_HEIGHT - 200
-            
-            # Determine collectible type based on rarity
-            rand = random.random()
-            if rand < 0.6:
-                collectible_type = "coin"
-            elif rand < 0.8:
-                collectible_type = "gem"
-            elif rand < 0.9:
-                collectible_type = "magnet"
-            elif rand < 0.95:
-                collectible_type = "speed"
+    def log_run_end(self, state):
+        # How long each power-up ran this run, then the end itself
+        for i, powerup in enumerate(POWERUPS):
+            if self.powerup_frames[powerup]:
+                self.log_event(EVENT_UPTIME, i, self.powerup_frames[powerup])
+        self.log_event(EVENT_RUN_END, state, self.frame)
+        self.telemetry.flush()
+    
+    def start_run(self, seed=None):
+        # reset_game leaves the state alone (the screens decide when play
+        # starts); programmatic players use this to start playing right away
+        self.reset_game(seed)
+        self.state = PLAYING
+    
+    def entity_stats(self):
+        # Entity stores grow by doubling and never shrink; particles use fixed slots
+        return {
+            "obstacles": self.obstacles.stats(),
+            "collectibles": self.collectibles.stats(),
+            "particles": {"in_use": len(self.particles), "capacity": self.particles.capacity}
+        }
+    
+    def level_speed(self, base_speed):
+        # Fastest the track can move past the next chunk
+        return (base_speed + LEVEL_SPEED_MARGIN) * SPEED_BOOST
+    
+    def spawn_entities(self):
+        # Bring in the prebuilt entities whose track position came into view,
+        # shifted back by however far the player overshot it this frame
+        speed = self.level_speed(self.base_speed)
+        for distance, kind, lane, entity_type, direction in self.level.due(self.distance, speed):
+            x = SCREEN_WIDTH - (self.distance - distance)
+            if kind == OBSTACLE:
+                self.obstacles.add(x, entity_type, lane, direction)
             else:
-                collectible_type = "invincibility"
-            
-            self.collectibles.append(Collectible(x, y, collectible_type))
-            self.collectible_timer = random.randint(30, 90)
-        else:
-            self.collectible_timer -= 1
+                self.collectibles.add(x, entity_type, lane, frame=self.frame)
+    
+    def despawn_x(self, store):
+        # Normally DESPAWN_X; at speeds where one step could carry an entity
+        # from in front of the player to past it, further left, so it is not
+        # dropped before the collision sweep has seen that step
+        return min(DESPAWN_X, LANES[0] - self.player.width // 2 - store.max_width - store.drift - self.game_speed)
     
     def check_collisions(self):
-        player_rect = self.player.get_rect()
-        
-        # Check obstacle collisions
-        for obstacle in self.obstacles[:]:
-            if obstacle.get_rect().colliderect(player_rect):
-                if not self.player.invincible:
-                    self.lives -= 1
-                    self.screen_shake = 20
-                    self.add_particles(self.player.x, self.player.y, RED, 10)
-                    
-                    if self.lives <= 0:
-                        self.state = GAME_OVER
-                        if self.score > self.high_score:
-                            self.high_score = self.score
-                            self.save_high_score()
-                    else:
-                        # Brief invincibility after hit
-                        self.player.invincible = True
-                        self.player.invincible_timer = 120
+        player = self.player
+        player_rect = player.get_rect()
+        
+        # Entities that move too far past the player in one step for the
+        # overlap test alone are swept: the player moves from where it was at
+        # the start of the step, sideways in a lane switch and vertically
+        prev_left = player.prev_x - player.width // 2
+        prev_top = player.prev_y - player.height
+        step = self.game_speed if self.swept_collisions else 0
+        
+        # Check obstacle collisions; only the first hit (by lane, then x) counts
+        obstacles = self.obstacles
+        hits = obstacles.colliding(player_rect, prev_left, prev_top, step)
+        if len(hits):
+            if len(hits) > 1:
+                hits = hits[np.lexsort((obstacles.x[hits], obstacles.lane[hits]))]
+            hit = hits[0]
+            if not self.player.invincible:
+                self.lives -= 1
+                self.screen_shake = 20
+                self.add_particles(self.player.x, self.player.y, RED, 10)
+                if self.telemetry:
+                    self.log_event(EVENT_HIT, obstacles.type[hit])
                 
-                self.obstacles.remove(obstacle)
-                break
+                if self.lives <= 0:
+                    self.state = GAME_OVER
+                    self.death_cause = obstacles.type_name(hit)
+                    self.finish_replay()
+                    self.record_run()
+                    if self.telemetry:
+                        self.log_run_end(GAME_OVER)
+                else:
+                    # Brief invincibility after hit
+                    self.player.invincible = True
+                    self.player.invincible_timer = 120
+            elif self.telemetry:
+                self.log_event(EVENT_SHIELDED, obstacles.type[hit])
+            
+            obstacles.remove(hit)
         
         # Check collectible collisions
-        for collectible in self.collectibles[:]:
-            if collectible.get_rect().colliderect(player_rect) and not collectible.collected:
-                collectible.collected = True
-                self.collect_item(collectible)
-                self.collectibles.remove(collectible)
+        hits = self.collectibles.colliding(player_rect, prev_left, prev_top, step)
+        if len(hits):
+            for hit in hits:
+                self.collect_item(hit)
+            self.collectibles.remove(hits)
     
-    def collect_item(self, collectible):
+    def collect_item(self, i):
+        collectibles = self.collectibles
+        collectible = collectibles.prototypes[collectibles.type[i]]
+        score = self.score
         if collectible.type == "coin":
             coin_value = collectible.value
             if self.powerups["double_coins"] > 0:
@@ -558,31 +1718,47 @@ class Game:
             self.player.invincible_timer = 300
         
         # Add particle effect
-        self.add_particles(collectible.x, collectible.y, collectible.color, 5)
+        self.add_particles(collectibles.x[i], collectibles.y[i], collectible.color, 5)
+        
+        if self.telemetry:
+            self.log_event(EVENT_COLLECT, collectibles.type[i], self.score - score)
+            if collectible.type in self.powerups:
+                self.log_event(EVENT_POWERUP_START, POWERUPS.index(collectible.type), self.powerups[collectible.type])
     
     def add_particles(self, x, y, color, count):
-        for _ in range(count):
-            velocity_x = random.uniform(-3, 3)
-            velocity_y = random.uniform(-5, -1)
-            self.particles.append(Particle(x, y, color, velocity_x, velocity_y))
+        # Particles are purely cosmetic, so headless runs skip them
+        if self.headless:
+            return
+        if self.quality["particles"] < 1.0:
+            count = max(int(count * self.quality["particles"]), 1)
+        self.particles.emit(x, y, color, count)
     
     def update_powerups(self):
         for powerup in self.powerups:
             if self.powerups[powerup] > 0:
+                self.powerup_frames[powerup] += 1
                 self.powerups[powerup] -= 1
                 
                 if powerup == "speed" and self.powerups[powerup] > 0:
-                    self.game_speed = self.base_speed * 1.5
+                    self.game_speed = self.base_speed * SPEED_BOOST
                 elif powerup == "speed" and self.powerups[powerup] == 0:
                     self.game_speed = self.base_speed
                 
                 if powerup == "invincibility" and self.powerups[powerup] == 0:
                     self.player.invincible = False
                     self.player.invincible_timer = 0
+                
+                if self.powerups[powerup] == 0 and self.telemetry:
+                    self.log_event(EVENT_POWERUP_END, POWERUPS.index(powerup), self.powerup_frames[powerup])
     
     def update_game(self):
+        self.frame += 1
+        
+        profiler = self.profiler
+        
         # Update player
         self.player.update()
+        profiler.mark("player")
         
         # Update distance and score
         self.distance += self.game_speed
@@ -597,177 +1773,640 @@ class Game:
         # Update combo
         if self.combo_timer > 0:
             self.combo_timer -= 1
-        else:
+        elif self.combo:
+            if self.telemetry:
+                self.log_event(EVENT_COMBO, value=self.combo)
             self.combo = 0
         
-        # Spawn obstacles and collectibles
-        self.spawn_obstacle()
-        self.spawn_collectible()
-        
-        # Update obstacles
-        for obstacle in self.obstacles[:]:
-            obstacle.update(self.game_speed)
-            if obstacle.x < -100:
-                self.obstacles.remove(obstacle)
+        # Spawn obstacles and collectibles from the level stream
+        self.spawn_entities()
+        profiler.mark("spawning")
         
-        # Update collectibles
-        for collectible in self.collectibles[:]:
-            collectible.update(self.game_speed)
-            if collectible.x < -100:
-                self.collectibles.remove(collectible)
+        # Update obstacles and collectibles, dropping those that left the screen
+        self.obstacles.advance(self.game_speed, self.despawn_x(self.obstacles))
+        self.collectibles.advance(self.game_speed, self.despawn_x(self.collectibles))
+        profiler.mark("entities")
         
         # Magnet effect
         if self.powerups["magnet"] > 0:
-            for collectible in self.collectibles:
-                if collectible.type in ["coin", "gem"]:
-                    dx = self.player.x - collectible.x
-                    dy = self.player.y - collectible.y
-                    distance = math.sqrt(dx*dx + dy*dy)
-                    if distance < 150:
-                        collectible.x += dx * 0.1
-                        collectible.y += dy * 0.1
+            self.collectibles.attract(self.player.x, self.player.y, MAGNET_RADIUS, MAGNET_STRENGTH)
+        profiler.mark("magnet")
         
         # Update particles
-        self.particles = [p for p in self.particles if p.update()]
+        self.particles.update()
+        profiler.mark("particles")
         
         # Update power-ups
         self.update_powerups()
+        profiler.mark("powerups")
         
         # Check collisions
         self.check_collisions()
+        profiler.mark("collisions")
         
         # Update screen shake
         if self.screen_shake > 0:
             self.screen_shake -= 1
+        
+        # Parallax scrolling is part of the simulation so it keeps a fixed pace
+        self.scroll_background()
     
-    def draw_background(self):
-        # Draw parallax background layers
+    def bake_background(self):
+        # Each parallax layer becomes a strip two screens wide, so a single
+        # blit at the layer offset covers the screen while it wraps
+        self.bg_strips = []
+        for layer in self.bg_layers:
+            strip = pygame.Surface((SCREEN_WIDTH * 2, SCREEN_HEIGHT)).convert()
+            for x in range(0, SCREEN_WIDTH * 2, 100):
+                pygame.draw.rect(strip, layer["color"], (x, 0, 100, SCREEN_HEIGHT))
+            self.bg_strips.append(strip)
+        
+        # Strips are opaque and cover the whole screen, so only the top one is visible
+        self.bg_first_visible = max(len(self.bg_strips) - 1, 0)
+        
+        # Single-colour strips look the same at any offset, which makes the
+        # background static and lets dirty-rect mode erase from a cached frame
+        self.background_static = all(
+            pygame.mask.from_threshold(strip, strip.get_at((0, 0)), (1, 1, 1, 255)).count()
+            == strip.get_width() * strip.get_height()
+            for strip in self.bg_strips[self.bg_first_visible:]
+        )
+        
+        # Ground and lane dividers
+        self.ground = pygame.Surface((SCREEN_WIDTH, 100)).convert()
+        self.ground.fill(BROWN)
+        for i in range(1, 3):
+            x = i * LANE_WIDTH
+            pygame.draw.line(self.ground, WHITE, (x, 0), (x, 100), 2)
+        
+        # Everything above was laid out at full resolution; shrink it once to
+        # the world resolution (nearest neighbour keeps the flat colours exact)
+        scale = self.render_scale
+        if scale != 1.0:
+            self.bg_strips = [pygame.transform.scale(strip, (int(strip.get_width() * scale), self.world_size[1]))
+                              for strip in self.bg_strips]
+            self.ground = pygame.transform.scale(self.ground, (self.world_size[0], int(100 * scale)))
+        self.ground_top = int((SCREEN_HEIGHT - 100) * scale)
+        
+        self.background = pygame.Surface(self.world_size).convert()
+        self.background.fill(BLACK)
+        for strip in self.bg_strips[self.bg_first_visible:]:
+            self.background.blit(strip, (0, 0))
+        self.background.blit(self.ground, (0, self.ground_top))
+        self.needs_full_redraw = True
+    
+    def scroll_background(self):
         for layer in self.bg_layers:
             layer["x"] -= layer["speed"]
             if layer["x"] <= -SCREEN_WIDTH:
                 layer["x"] = 0
-            
-            # Draw repeating background rectangles
-            for x in range(int(layer["x"]), SCREEN_WIDTH + 100, 100):
-                pygame.draw.rect(self.screen, layer["color"], (x, 0, 100, SCREEN_HEIGHT))
+    
+    def draw_background(self, surface=None):
+        # Draw parallax background layers (into the world surface by default)
+        surface = surface or self.world
+        if not self.quality["parallax"] and self.bg_strips:
+            # Without parallax the baked frame (layers at rest and the ground) stands in
+            surface.blit(self.background, (0, 0))
+            return
         
-        # Draw ground
-        pygame.draw.rect(self.screen, BROWN, (0, SCREEN_HEIGHT - 100, SCREEN_WIDTH, 100))
+        scale = self.render_scale
+        if not self.bg_strips:
+            surface.fill(BLACK)
+        for layer, strip in zip(self.bg_layers[self.bg_first_visible:], self.bg_strips[self.bg_first_visible:]):
+            surface.blit(strip, (int(layer["x"] * scale), 0))
         
-        # Draw lane dividers
-        for i in range(1, 3):
-            x = i * LANE_WIDTH
-            pygame.draw.line(self.screen, WHITE, (x, SCREEN_HEIGHT - 100), (x, SCREEN_HEIGHT), 2)
+        # Draw ground and lane dividers
+        surface.blit(self.ground, (0, self.ground_top))
     
-    def draw_game(self):
-        # Apply screen shake
-        shake_x = random.randint(-self.screen_shake, self.screen_shake) if self.screen_shake > 0 else 0
-        shake_y = random.randint(-self.screen_shake, self.screen_shake) if self.screen_shake > 0 else 0
+    def draw_game(self, alpha=1.0):
+        if self.pending_assets:
+            self.load_assets()
         
-        # Fill screen
-        self.screen.fill(BLACK)
+        # alpha is how far rendering sits between the last two simulation steps
+        # Screen shake offsets the whole world when it is presented
+        shake_x = self.fx_rng.randint(-self.screen_shake, self.screen_shake) if self.screen_shake > 0 else 0
+        shake_y = self.fx_rng.randint(-self.screen_shake, self.screen_shake) if self.screen_shake > 0 else 0
         
-        # Draw background
-        self.draw_background()
+        # At full scale the world is drawn straight to the screen unless it has
+        # to be shaken; otherwise it goes through the offscreen world surface
+        scale = self.render_scale
+        world = self.screen if scale == 1.0 and not (shake_x or shake_y) else self.world
         
-        # Draw particles
-        for particle in self.particles:
-            particle.draw(self.screen)
+        # In dirty-rect mode only the areas drawn last frame are erased
+        full = not (self.dirty_mode and self.background_static) or self.needs_full_redraw or world is not self.screen
+        if full:
+            self.draw_background(world)
+        else:
+            for rect in self.prev_rects:
+                world.blit(self.background, rect, rect)
+        self.profiler.mark("background")
         
-        # Draw obstacles
-        for obstacle in self.obstacles:
-            obstacle.draw(self.screen)
+        rects = []
         
-        # Draw collectibles
-        for collectible in self.collectibles:
-            collectible.draw(self.screen)
+        # Draw particles
+        self.particles.draw(world, rects if self.dirty_mode else None, scale)
+        
+        # Draw obstacles and collectibles
+        self.obstacles.draw(world, alpha, rects, scale=scale)
+        self.collectibles.draw(world, alpha, rects, self.frame if self.quality["float"] else None, scale)
         
         # Draw player
-        self.player.draw(self.screen)
+        rects.append(self.player.draw(world, alpha, scale))
+        self.profiler.mark("draw_entities")
+        
+        if world is not self.screen:
+            self.present_world(shake_x, shake_y)
+            self.profiler.mark("present_world")
         
         # Draw UI
-        self.ui.draw_game_ui(self.screen, self.score, self.coins, self.lives, self.game_speed, self.powerups)
+        rects.append(self.draw_hud())
         
         # Draw combo
         if self.combo > 1:
-            combo_text = self.ui.font.render(f"COMBO x{self.combo}", True, YELLOW)
-            self.screen.blit(combo_text, (SCREEN_WIDTH - 200, 10))
+            combo_text = self.ui.text.render(self.ui.font, f"COMBO x{self.combo}", YELLOW)
+            rects.append(self.screen.blit(combo_text, (SCREEN_WIDTH - 200, 10)))
+        self.profiler.mark("hud")
         
-        # Apply shake offset
-        if shake_x != 0 or shake_y != 0:
-            # This is a simplified shake effect
-            pass
+        if self.dirty_mode:
+            self.dirty_rects = None if full else self.prev_rects + rects
+            self.prev_rects = rects
+            # A shaken frame leaves the screen offset, so the next one starts over
+            self.needs_full_redraw = world is not self.screen
+    
+    def draw_hud(self):
+        # At lower quality the HUD is redrawn every hud_interval frames into a
+        # cached layer, which is blitted in between; returns the drawn rect
+        interval = self.quality["hud_interval"]
+        if interval == 1:
+            return self.ui.draw_game_ui(self.screen, self.score, self.coins, self.lives, self.game_speed, self.powerups)
+        if self.hud_layer is None:
+            self.hud_layer = pygame.Surface(HUD_SIZE, pygame.SRCALPHA)
+        self.hud_age -= 1
+        if self.hud_age <= 0:
+            self.hud_layer.fill((0, 0, 0, 0))
+            self.ui.draw_game_ui(self.hud_layer, self.score, self.coins, self.lives, self.game_speed, self.powerups)
+            self.hud_age = interval
+        return self.screen.blit(self.hud_layer, (0, 0))
+    
+    def present_world(self, shake_x=0, shake_y=0):
+        # Scale the world surface up to the window, offset by the shake
+        if not (shake_x or shake_y):
+            pygame.transform.scale(self.world, (SCREEN_WIDTH, SCREEN_HEIGHT), self.screen)
+            return
+        frame = self.world
+        if self.render_scale != 1.0:
+            frame = pygame.transform.scale(self.world, (SCREEN_WIDTH, SCREEN_HEIGHT), self.upscaled)
+        self.screen.blit(frame, (shake_x, shake_y))
+        
+        # Clear the edges the offset uncovered
+        if shake_x > 0:
+            self.screen.fill(BLACK, (0, 0, shake_x, SCREEN_HEIGHT))
+        elif shake_x < 0:
+            self.screen.fill(BLACK, (SCREEN_WIDTH + shake_x, 0, -shake_x, SCREEN_HEIGHT))
+        if shake_y > 0:
+            self.screen.fill(BLACK, (0, 0, SCREEN_WIDTH, shake_y))
+        elif shake_y < 0:
+            self.screen.fill(BLACK, (0, SCREEN_HEIGHT + shake_y, SCREEN_WIDTH, -shake_y))
+    
+    def draw_frozen(self):
+        # Paused or game-over frame; returns False when the screen already
+        # shows it and nothing needs to be presented
+        key = (self.state, self.score, self.high_score)
+        if key == self.frozen_key and not self.profiler.overlay_visible:
+            return False
+        
+        if not self.frozen:
+            # Draw the scene once more without interpolation and keep a copy
+            self.draw_game()
+            if self.frozen_scene is None:
+                self.frozen_scene = self.screen.copy()
+            else:
+                self.frozen_scene.blit(self.screen, (0, 0))
+            self.frozen = True
+        else:
+            self.screen.blit(self.frozen_scene, (0, 0))
+        
+        if self.state == PAUSED:
+            self.ui.draw_pause(self.screen)
+        else:
+            self.ui.draw_game_over(self.screen, self.score, self.high_score)
+        self.frozen_key = key
+        self.invalidate()
+        return True
+    
+    def thaw(self):
+        # Leaving a paused or game-over screen: the next still is captured afresh
+        self.frozen = False
+        self.frozen_key = None
+    
+    def invalidate(self):
+        # Force a full redraw and flip, e.g. after an overlay covered the screen
+        self.dirty_rects = None
+        self.needs_full_redraw = True
+    
+    def present(self):
+        if self.dirty_rects is not None:
+            pygame.display.update(self.dirty_rects)
+        else:
+            pygame.display.flip()
+    
+    def apply_action(self, action):
+        if self.recorder:
+            self.recorder.record(self.frame, ACTIONS.index(action))
+        
+        if action == ACTION_JUMP:
+            self.player.jump()
+        elif action == ACTION_SLIDE:
+            self.player.slide()
+        elif action == ACTION_LEFT:
+            self.player.move_left()
+        elif action == ACTION_RIGHT:
+            self.player.move_right()
+    
+    def step(self, actions=()):
+        # Advance the simulation by one frame; returns False once the run is over
+        if self.state != PLAYING:
+            return False
+        for action in actions:
+            self.apply_action(action)
+        self.update_game()
+        return self.state == PLAYING
+    
+    def run_headless(self, max_frames, inputs=None):
+        # Step the simulation as fast as possible, driven by an input source
+        # called as inputs(game, frame) -> iterable of actions
+        if self.state != PLAYING:
+            self.start_run()
+        
+        frames = 0
+        while frames < max_frames:
+            actions = inputs(self, self.frame) if inputs else ()
+            frames += 1
+            if not self.step(actions):
+                break
+        
+        return {
+            "frames": frames,
+            "score": self.score,
+            "coins": self.coins,
+            "distance": self.distance,
+            "lives": self.lives,
+            "game_over": self.state == GAME_OVER
+        }
+    
+    def toggle_trace(self):
+        # Start a Chrome trace, or stop and write the current one
+        if self.profiler.recording:
+            self.profiler.stop_recording()
+            self.profiler.export_chrome_trace(self.trace_path or "trace_%d.json" % int(time.time()))
+        else:
+            self.profiler.start_recording()
+    
+    def finish_replay(self):
+        if not self.recorder:
+            return None
+        self.last_replay = self.recorder.finish(self.frame)
+        self.recorder = None
+        if self.replay_dir:
+            path = os.path.join(self.replay_dir, "run_%d_%d.trr" % (int(time.time()), self.last_replay.seed))
+            self.last_replay.save(path)
+        return self.last_replay
+    
+    def save_state(self):
+        # Compact binary snapshot of the simulation (see snapshot.py)
+        return capture(self)
+    
+    def load_state(self, data):
+        # Continue from a save_state() snapshot of this run; the replay being
+        # recorded drops the actions taken after it
+        restore(self, data)
+        self.input.clear()
+        self.particles.clear()
+        self.accumulator = 0.0
+        if self.recorder:
+            events = self.recorder.replay.events
+            while events and events[-1][0] >= self.frame:
+                events.pop()
+        self.thaw()
+        self.invalidate()
+    
+    def rewind_by(self, seconds):
+        # Go back up to seconds of play, as far as the rewind buffer reaches;
+        # a paused game stays paused
+        if not self.rewind:
+            return
+        state = self.state
+        previous = self.frame
+        frame = max(self.frame - int(seconds * FPS), self.rewind.oldest())
+        self.load_state(self.rewind.get(frame))
+        self.rewind.truncate(frame)
+        self.assisted = True
+        if state == PAUSED:
+            self.state = PAUSED
+        if self.telemetry:
+            self.log_event(EVENT_REWIND, value=previous)
+    
+    def quick_save(self):
+        events = list(self.recorder.replay.events) if self.recorder else []
+        self.saved_state = (self.save_state(), events)
+    
+    def quick_load(self):
+        # The saved state may come from an earlier run, so its inputs come
+        # along to keep the replay of the continued run complete
+        if not self.saved_state:
+            return
+        data, events = self.saved_state
+        previous = self.frame
+        self.load_state(data)
+        self.recorder = ReplayRecorder(self.seed)
+        self.recorder.replay.events = list(events)
+        if self.rewind is not None:
+            self.rewind.clear()
+        self.assisted = True
+        if self.telemetry:
+            self.log_event(EVENT_REWIND, value=previous)
+    
+    def set_state(self, state):
+        # Screen changes the player asked for; leaving a run for the menu ends it
+        if self.telemetry:
+            self.log_event(EVENT_STATE, state, self.state)
+            if state == MENU and self.state != GAME_OVER:
+                self.log_run_end(MENU)
+        self.state = state
+    
+    def play_replay(self, replay):
+        # Re-run a recorded game headlessly; the result matches the original run
+        self.reset_game(replay.seed)
+        self.state = PLAYING
+        inputs = ScriptedInput([(frame, ACTIONS[code]) for frame, code in replay.events])
+        return self.run_headless(replay.frames, inputs)
     
     def handle_events(self):
+        # pygame does not expose SDL's event timestamps, so everything read in
+        # one pass is stamped with the time the queue was drained
+        stamp = time.perf_counter()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
             
+            if event.type == pygame.WINDOWEXPOSED:
+                # The window contents were lost; a frozen screen has to be presented again
+                self.frozen_key = None
+            
             if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    self.profiler.toggle_overlay()
+                    self.invalidate()
+                    continue
+                if event.key == pygame.K_F4:
+                    self.toggle_trace()
+                    continue
+                # Rewind and save states only apply to a run still in progress
+                if self.rewind is not None and self.state in (PLAYING, PAUSED):
+                    if event.key == pygame.K_BACKSPACE:
+                        self.rewind_by(REWIND_STEP)
+                        continue
+                    if event.key == pygame.K_F5:
+                        self.quick_save()
+                        continue
+                    if event.key == pygame.K_F9:
+                        self.quick_load()
+                        continue
+                
                 if self.state == MENU:
                     if event.key == pygame.K_SPACE:
-                        self.state = PLAYING
+                        # Reset first so the state change is logged as part of the new run
                         self.reset_game()
+                        self.set_state(PLAYING)
                 
                 elif self.state == PLAYING:
-                    if event.key == pygame.K_SPACE or event.key == pygame.K_UP:
-                        self.player.jump()
-                    elif event.key == pygame.K_DOWN:
-                        self.player.slide()
-                    elif event.key == pygame.K_LEFT:
-                        self.player.move_left()
-                    elif event.key == pygame.K_RIGHT:
-                        self.player.move_right()
+                    if event.key in KEY_ACTIONS:
+                        if not self.autopilot:
+                            self.input.push(KEY_ACTIONS[event.key], stamp, self.frame)
                     elif event.key == pygame.K_p:
-                        self.state = PAUSED
+                        self.set_state(PAUSED)
+                        self.input.clear()
                     elif event.key == pygame.K_ESCAPE:
-                        self.state = MENU
+                        self.set_state(MENU)
+                        self.input.clear()
                 
                 elif self.state == PAUSED:
                     if event.key == pygame.K_p:
-                        self.state = PLAYING
+                        self.set_state(PLAYING)
                     elif event.key == pygame.K_ESCAPE:
-                        self.state = MENU
+                        self.set_state(MENU)
                 
                 elif self.state == GAME_OVER:
                     if event.key == pygame.K_SPACE:
-                        self.state = PLAYING
+                        # Reset first so the state change is logged as part of the new run
                         self.reset_game()
+                        self.set_state(PLAYING)
                     elif event.key == pygame.K_ESCAPE:
-                        self.state = MENU
+                        self.set_state(MENU)
         
         return True
     
+    def advance(self, frame_time):
+        # Run as many fixed simulation steps as real time allows and return the
+        # interpolation factor for rendering the leftover fraction of a step
+        self.accumulator += frame_time
+        steps = 0
+        while self.accumulator >= SIM_DT and self.state == PLAYING:
+            if self.autopilot:
+                for action in self.autopilot(self, self.frame):
+                    self.apply_action(action)
+            else:
+                self.input.apply(self)
+            self.update_game()
+            if self.rewind is not None:
+                self.rewind.push(self.frame, self.save_state())
+            self.accumulator -= SIM_DT
+            steps += 1
+            if steps >= MAX_STEPS_PER_FRAME:
+                # Too far behind: drop the backlog rather than slowing every frame
+                self.accumulator = 0.0
+                break
+        
+        if self.state != PLAYING:
+            return 1.0
+        return self.accumulator / SIM_DT
+    
     def run(self):
         running = True
+        playing = False
+        previous = time.perf_counter()
+        profiler = self.profiler
         while running:
+            profiler.begin_frame()
             running = self.handle_events()
+            profiler.mark("events")
+            
+            now = time.perf_counter()
+            frame_time = now - previous
+            previous = now
+            if not playing:
+                # Time spent on another screen is not simulated on return
+                frame_time = min(frame_time, SIM_DT)
+            if self.autopilot and self.state == GAME_OVER:
+                self.state = PLAYING
+                self.reset_game()
+            playing = self.state == PLAYING
+            changed = True
             
             if self.state == PLAYING:
-                self.update_game()
-                self.draw_game()
+                self.thaw()
+                alpha = self.advance(frame_time)
+                self.draw_game(alpha)
             elif self.state == MENU:
-                self.ui.draw_menu(self.screen)
-            elif self.state == PAUSED:
-                self.draw_game()
-                # Draw pause overlay
-                overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-                overlay.set_alpha(128)
-                overlay.fill(BLACK)
-                self.screen.blit(overlay, (0, 0))
-                
-                pause_text = self.ui.big_font.render("PAUSED", True, WHITE)
-                pause_rect = pause_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-                self.screen.blit(pause_text, pause_rect)
-            elif self.state == GAME_OVER:
-                self.draw_game()
-                self.ui.draw_game_over(self.screen, self.score, self.high_score)
+                self.thaw()
+                self.ui.draw_menu(self.screen, self.rewind is not None)
+                self.invalidate()
+            else:
+                changed = self.draw_frozen()
             
-            pygame.display.flip()
-            self.clock.tick(FPS)
+            if profiler.overlay_visible:
+                if self.input.latencies:
+                    profiler.labels["input"] = "%.1f ms" % (sum(self.input.latencies) / len(self.input.latencies))
+                profiler.draw_overlay(self.screen, self.ui.small_font, self.ui.text)
+                self.invalidate()
+                profiler.mark("overlay")
+            
+            # The governor sees the time spent on gameplay frames up to the
+            # flip, which excludes waiting on the frame cap or vsync
+            if self.governor and playing and self.state == PLAYING:
+                if self.governor.update(time.perf_counter() - now):
+                    self.set_quality(self.governor.level)
+            if self.telemetry:
+                self.telemetry.tick()
+            
+            if changed:
+                self.present()
+            profiler.mark("flip")
+            profiler.end_frame()
+            
+            if "first_frame" not in self.startup:
+                self.mark_startup("first_frame")
+            elif self.pending_assets and self.state == MENU:
+                self.load_assets(1)
+            
+            if not changed:
+                # Nothing on screen moves; just keep polling for input
+                self.clock.tick(IDLE_FPS)
+            elif self.render_rate == "vsync" or not self.render_rate:
+                self.clock.tick()
+            else:
+                self.clock.tick(self.render_rate)
         
+        if profiler.recording:
+            self.toggle_trace()
+        if self.report_input:
+            print(json.dumps({"input_latency": self.input.summary()}))
+        if self.autopilot:
+            print(json.dumps({"autopilot": self.autopilot.summary()}))
+        if self.telemetry:
+            if self.state in (PLAYING, PAUSED):
+                self.log_run_end(self.state)
+            self.telemetry.close()
+        if self.level:
+            self.level.close()
+        if self.leaderboard:
+            self.leaderboard.close()
         pygame.quit()
 
+def check_seed(seed):
+    if not 0 <= seed <= MAX_SEED:
+        raise ValueError("Seed must be between 0 and %d, got %r" % (MAX_SEED, seed))
+    return seed
+
+def seed_arg(text):
+    try:
+        return check_seed(int(text))
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+def main():
+    parser = argparse.ArgumentParser(description="Temple Run style endless runner")
+    parser.add_argument("--headless", type=int, metavar="FRAMES",
+                        help="simulate FRAMES frames without a window and print the result")
+    parser.add_argument("--input-seed", type=int, default=None,
+                        help="seed for the random input used by --headless")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="only redraw and present the parts of the screen that changed")
+    parser.add_argument("--seed", type=seed_arg, default=None,
+                        help="play every run with this gameplay seed")
+    parser.add_argument("--leaderboard", metavar="FILE", default=LEADERBOARD_PATH,
+                        help="SQLite database of finished runs (default: %(default)s)")
+    parser.add_argument("--record", metavar="DIR",
+                        help="save a replay of every finished run to DIR")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="play back a recorded replay headlessly and print the result")
+    parser.add_argument("--profile-trace", metavar="FILE",
+                        help="record per-phase frame timings for the whole session as a Chrome trace")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print how long startup took once all assets are loaded")
+    parser.add_argument("--render-scale", type=float, choices=RENDER_SCALES, default=1.0,
+                        help="draw the world at this fraction of the window resolution; the HUD stays sharp")
+    parser.add_argument("--quality", choices=["auto"] + QUALITY_NAMES, default="auto",
+                        help="detail level; auto adjusts it to hold the frame rate (default: %(default)s)")
+    parser.add_argument("--input-buffer", type=int, default=INPUT_BUFFER_MS, metavar="MS",
+                        help="how long a press the player cannot act on yet stays queued (default: %(default)s)")
+    parser.add_argument("--input-report", action="store_true",
+                        help="print input-to-action latency statistics on exit")
+    parser.add_argument("--rewind-seconds", type=float, default=REWIND_SECONDS, metavar="SECONDS",
+                        help="enable Backspace rewind and F5/F9 save states, keeping this much play (e.g. 180); "
+                             "runs that use them are not submitted to the leaderboard (default: %(default)s, off)")
+    parser.add_argument("--autopilot", action="store_true",
+                        help="let the built-in AI play (with --headless, instead of random input); "
+                             "its runs are not submitted to the leaderboard")
+    parser.add_argument("--autopilot-budget", type=float, default=AUTOPILOT_BUDGET_MS, metavar="MS",
+                        help="search time the autopilot may spend per simulation step (default: %(default)s)")
+    parser.add_argument("--telemetry", metavar="DIR",
+                        help="log gameplay events to binary files in DIR (analyze them with telemetry.py)")
+    parser.add_argument("--fps", choices=list(RENDER_RATES), default="60",
+                        help="display rate; the simulation always runs at %d steps per second" % FPS)
+    args = parser.parse_args()
+    
+    if args.replay:
+        game = Game(headless=True)
+        start = time.perf_counter()
+        result = game.play_replay(Replay.load(args.replay))
+        elapsed = time.perf_counter() - start
+        result["seconds"] = round(elapsed, 4)
+        print(json.dumps(result))
+        return
+    
+    if args.headless is not None:
+        game = Game(headless=True, seed=args.seed, replay_dir=args.record, telemetry_dir=args.telemetry)
+        inputs = Autopilot(args.autopilot_budget) if args.autopilot else RandomInput(args.input_seed)
+        start = time.perf_counter()
+        result = game.run_headless(args.headless, inputs)
+        if game.recorder:
+            game.finish_replay()
+        elapsed = time.perf_counter() - start
+        result["seconds"] = round(elapsed, 4)
+        result["frames_per_ms"] = round(result["frames"] / max(elapsed * 1000, 1e-9), 2)
+        if args.autopilot:
+            result["autopilot"] = inputs.summary()
+        if game.telemetry:
+            if game.state == PLAYING:
+                game.log_run_end(PLAYING)
+            game.telemetry.close()
+            result["telemetry"] = game.telemetry.stats()
+        print(json.dumps(result))
+        return
+    
+    game = Game(dirty_rects=args.dirty_rects, render_rate=RENDER_RATES[args.fps], seed=args.seed,
+                replay_dir=args.record, leaderboard_path=None if args.autopilot else args.leaderboard, render_scale=args.render_scale,
+                quality=args.quality, input_buffer=args.input_buffer, rewind_seconds=args.rewind_seconds,
+                telemetry_dir=args.telemetry)
+    game.report_startup = args.startup_report
+    game.report_input = args.input_report
+    if args.autopilot:
+        game.autopilot = Autopilot(args.autopilot_budget)
+    if args.profile_trace:
+        game.trace_path = args.profile_trace
+        game.profiler.start_recording()
+    game.run()
+
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import pytest
+
+from templerun_claude import Game, LANES
+
+# Scroll speeds in px/step, well past anything a run reaches (one step must
+# not carry a spawn past the player, so below ~570), and the entity types a
+# standing player overlaps
+SPEEDS = [8, 16, 32, 60, 90, 120, 150, 180, 240, 320, 400, 480, 560]
+PHASES = 16  # Starting offsets tried per speed, spread over one step
+OBSTACLES = ["barrier", "moving"]
+COLLECTIBLES = ["coin", "gem"]
+
+def count_misses(game, speed, add):
+    # Put one entity just ahead of the standing player at each phase of a
+    # step and run until it is hit or gone; returns how many were missed
+    misses = 0
+    for phase in range(PHASES):
+        game.reset_game(1)
+        game.level.next_distance = float("inf")
+        add(game, game.player.get_rect().right + 1 + speed * phase // PHASES)
+        lives, coins = game.lives, game.coins
+        while len(game.obstacles) + len(game.collectibles) and game.lives == lives and game.coins == coins:
+            game.base_speed = game.game_speed = speed
+            game.step()
+        if game.lives == lives and game.coins == coins:
+            misses += 1
+    return misses
+
+def misses_at(speed, swept):
+    game = Game(headless=True, seed=1)
+    game.swept_collisions = swept
+    missed = 0
+    for obstacle_type in OBSTACLES:
+        missed += count_misses(game, speed, lambda game, x: game.obstacles.add(x, obstacle_type, 1))
+    for collectible_type in COLLECTIBLES:
+        missed += count_misses(game, speed, lambda game, x: game.collectibles.add(x, collectible_type, 1))
+    return missed
+
+@pytest.mark.parametrize("speed", SPEEDS)
+def test_swept_collisions_never_tunnel(speed):
+    assert misses_at(speed, swept=True) == 0
+
+@pytest.mark.parametrize("speed", [8, 16, 32])
+def test_discrete_collisions_hold_at_normal_speeds(speed):
+    # Control: the harness registers every hit when no tunneling is possible
+    assert misses_at(speed, swept=False) == 0
+
+@pytest.mark.parametrize("speed", [120, 240, 560])
+def test_discrete_collisions_tunnel_at_high_speeds(speed):
+    # Control: without the sweep the harness does see entities pass through
+    assert misses_at(speed, swept=False) > 0
+
+# A lane switch covers a fifth of the remaining distance per step, so the
+# player itself moves up to 80 px sideways into whatever comes the other way
+SWITCH_SPEEDS = [40, 50, 60, 80]
+PLACEMENTS = 100
+
+def switching_misses(speed, swept):
+    # Start a switch to the right with a barrier coming the other way, at
+    # PLACEMENTS offsets spread over the first few steps of the switch
+    game = Game(headless=True, seed=1)
+    game.swept_collisions = swept
+    misses = 0
+    for placement in range(PLACEMENTS):
+        game.reset_game(1)
+        game.level.next_distance = float("inf")
+        player = game.player
+        player.lane = 0
+        player.x = player.prev_x = player.target_x = LANES[0]
+        player.move_right()
+        game.obstacles.add(player.get_rect().right + 1 + 3 * (speed + 60) * placement // PLACEMENTS, "barrier", 1)
+        lives = game.lives
+        while len(game.obstacles) and game.lives == lives:
+            game.base_speed = game.game_speed = speed
+            game.step()
+        if game.lives == lives:
+            misses += 1
+    return misses
+
+@pytest.mark.parametrize("speed", SWITCH_SPEEDS)
+def test_swept_collisions_cover_lane_switches(speed):
+    assert switching_misses(speed, swept=True) == 0
+
+def test_discrete_collisions_tunnel_mid_switch():
+    # Control: scroll and switch together outrun the overlap test
+    assert switching_misses(80, swept=False) > 0
@@ -0,0 +1,25 @@
+import pytest
+
+import templerun_claude
+from templerun_claude import Game, RandomInput
+from sweep import ReactiveBot
+
+def trace(seed, frames=4000):
+    # Everything a step can change in the entity stores, frame by frame
+    game = Game(headless=True, seed=seed)
+    game.start_run(seed)
+    bot, presses = ReactiveBot(), RandomInput(seed, 0.03)
+    states = []
+    while game.frame < frames and game.step(tuple(bot(game, game.frame)) + tuple(presses(game, game.frame))):
+        states.append((game.score, game.coins, game.lives, game.death_cause,
+                       game.obstacles.x[:game.obstacles.count].tolist(),
+                       game.obstacles.direction[:game.obstacles.count].tolist(),
+                       game.collectibles.x[:game.collectibles.count].tolist(),
+                       game.collectibles.y[:game.collectibles.count].tolist()))
+    return states
+
+@pytest.mark.parametrize("seed", [1, 2, 3, 4])
+def test_row_loops_match_column_operations(seed, monkeypatch):
+    rows = trace(seed)
+    monkeypatch.setattr(templerun_claude, "SCALAR_ENTITIES", 0)
+    assert trace(seed) == rows
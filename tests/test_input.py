@@ -0,0 +1,32 @@
+import pytest
+
+from templerun_claude import Game, InputBuffer, ACTION_LEFT, ACTION_RIGHT
+
+def play(game, buffer, presses, frames):
+    # Step an empty track, pressing each (frame, action) as its frame comes
+    game.start_run(1)
+    game.level.next_distance = float("inf")
+    for frame in range(frames):
+        for pressed, action in presses:
+            if pressed == frame:
+                buffer.push(action, 0.0, game.frame)
+        buffer.apply(game)
+        game.update_game()
+
+@pytest.mark.parametrize("delay", [2, 5, 10, 15, 20])
+def test_switch_queued_behind_a_switch_is_kept(delay):
+    # The window is far shorter than a lane switch, but it only starts once
+    # the switch blocking the press is over
+    game = Game(headless=True, seed=1)
+    buffer = InputBuffer(150)
+    assert buffer.window < 20
+    play(game, buffer, [(0, ACTION_RIGHT), (delay, ACTION_LEFT)], 120)
+    assert game.player.lane == 1 and not game.player.moving
+    assert buffer.applied == 2 and buffer.buffered == 1 and buffer.expired == 0
+
+def test_impossible_switch_expires():
+    game = Game(headless=True, seed=1)
+    buffer = InputBuffer(150)
+    play(game, buffer, [(0, ACTION_RIGHT), (5, ACTION_RIGHT)], 120)
+    assert game.player.lane == 2
+    assert buffer.applied == 1 and buffer.expired == 1 and not buffer.pending
@@ -0,0 +1,42 @@
+from levelgen import LevelStream, OBSTACLE, obstacle_windows
+from templerun_claude import (COLLECTIBLE_RARITY, JUMP_FRAMES, LEVEL_LIBRARY, LEVEL_MIN_GAP, LEVEL_SPEED,
+                              OBSTACLE_EXTENTS, SEGMENT_GAP)
+
+# Speeds passed to the stream, one per step: from below LEVEL_SPEED to more
+# than three times it
+SPEEDS = [8 + step / 500 for step in range(25000)]
+
+def drive(threaded):
+    # Walk a stream along the track; returns every chunk it started, in
+    # order, with the speed it was started at
+    level = LevelStream(LEVEL_LIBRARY, 7, LEVEL_MIN_GAP, SEGMENT_GAP, COLLECTIBLE_RARITY, threaded,
+                        LEVEL_SPEED, SPEEDS[0])
+    chunks = [(level.chunk, SPEEDS[0])]
+    distance = 0.0
+    for speed in SPEEDS:
+        distance += speed
+        level.due(distance, speed)
+        if level.chunk is not chunks[-1][0]:
+            chunks.append((level.chunk, speed))
+    level.close()
+    return chunks
+
+def test_threaded_stream_matches_inline():
+    assert drive(True) == drive(False)
+
+def test_gaps_stretch_with_speed():
+    # Every obstacle is followed by a jump's worth of track at the speed its
+    # chunk was started at (or the one before it, across a boundary)
+    windows = []
+    for chunk, speed in drive(False):
+        spawns = [record[:4] for record in chunk if record[1] == OBSTACLE]
+        windows += [(start, end, max(speed, LEVEL_SPEED)) for start, end in obstacle_windows(spawns, OBSTACLE_EXTENTS)]
+    assert windows[-1][2] > 3 * LEVEL_SPEED
+    for (start, end, speed), (next_start, next_end, next_speed) in zip(windows, windows[1:]):
+        assert next_start - end >= JUMP_FRAMES * min(speed, next_speed) - 1e-6
+
+def test_slow_chunks_are_not_stretched():
+    level = LevelStream(LEVEL_LIBRARY, 7, LEVEL_MIN_GAP, SEGMENT_GAP, COLLECTIBLE_RARITY, False, LEVEL_SPEED, 8)
+    reference = LevelStream(LEVEL_LIBRARY, 7, LEVEL_MIN_GAP, SEGMENT_GAP, COLLECTIBLE_RARITY)
+    assert level.chunk == reference.chunk
+    assert level.resume == reference.resume
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from replay import Replay, ReplayRecorder, write_varint, read_varint
+from templerun_claude import Game, RandomInput, MAX_SEED
+
+def test_varint_round_trip():
+    values = [0, 1, 127, 128, 300, 2 ** 32 - 1, 2 ** 63 + 5]
+    out = bytearray()
+    for value in values:
+        write_varint(out, value)
+    pos = 0
+    for value in values:
+        decoded, pos = read_varint(out, pos)
+        assert decoded == value
+    assert pos == len(out)
+
+def test_varint_rejects_negative():
+    with pytest.raises(ValueError):
+        write_varint(bytearray(), -1)
+
+def test_truncated_varint():
+    with pytest.raises(ValueError):
+        read_varint(b"\x80", 0)
+
+def test_replay_round_trip():
+    replay = Replay(MAX_SEED, 1234, [(0, 0), (5, 3), (5, 1), (900, 2)])
+    loaded = Replay.from_bytes(replay.to_bytes())
+    assert (loaded.seed, loaded.frames, loaded.events) == (replay.seed, replay.frames, replay.events)
+
+def test_recorder_rejects_wide_codes():
+    with pytest.raises(ValueError):
+        ReplayRecorder(1).record(0, 4)
+
+def test_failed_save_leaves_no_file(tmp_path):
+    path = tmp_path / "bad.trr"
+    with pytest.raises(ValueError):
+        Replay(-1).save(str(path))
+    assert not os.path.exists(path)
+
+@pytest.mark.parametrize("seed", [-1, MAX_SEED + 1])
+def test_out_of_range_seeds(seed):
+    with pytest.raises(ValueError):
+        Game(headless=True, seed=seed)
+    game = Game(headless=True)
+    with pytest.raises(ValueError):
+        game.reset_game(seed)
+
+@pytest.mark.parametrize("seed", [1, 7, 1234, MAX_SEED])
+def test_replay_reproduces_run(seed, tmp_path):
+    # Playing back a saved recording ends in exactly the state the run did
+    game = Game(headless=True, seed=seed, replay_dir=str(tmp_path))
+    result = game.run_headless(20000, RandomInput(seed))
+    if game.recorder:
+        game.finish_replay()
+    final = game.save_state()
+    path, = tmp_path.iterdir()
+    
+    replayed = Game(headless=True)
+    assert replayed.play_replay(Replay.load(str(path))) == result
+    assert replayed.save_state() == final
+
+def test_runs_are_deterministic():
+    states = []
+    for _ in range(2):
+        game = Game(headless=True, seed=99)
+        game.run_headless(3000, RandomInput(5))
+        states.append(game.save_state())
+    assert states[0] == states[1]
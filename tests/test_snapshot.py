@@ -0,0 +1,111 @@
+import pytest
+
+from snapshot import RewindBuffer, capture, restore
+from templerun_claude import Game, RandomInput
+
+def play(game, frames, seed):
+    inputs = RandomInput(seed)
+    for _ in range(frames):
+        if not game.step(inputs(game, game.frame)):
+            break
+
+@pytest.mark.parametrize("seed", [1, 2, 3, 42])
+def test_restored_game_continues_identically(seed):
+    game = Game(headless=True, seed=seed)
+    play(game, 200, seed)
+    snapshot = capture(game)
+    play(game, 300, seed + 1)
+    expected = capture(game)
+    
+    # Into the same game, and into a fresh one on a different run
+    restore(game, snapshot)
+    assert capture(game) == snapshot
+    play(game, 300, seed + 1)
+    assert capture(game) == expected
+    
+    other = Game(headless=True, seed=seed + 100)
+    restore(other, snapshot)
+    assert capture(other) == snapshot
+    play(other, 300, seed + 1)
+    assert capture(other) == expected
+
+def test_restore_rejects_other_data():
+    with pytest.raises(ValueError):
+        restore(Game(headless=True), b"not a snapshot")
+
+def snapshots(count, seed=5):
+    game = Game(headless=True, seed=seed)
+    inputs = RandomInput(seed)
+    states = []
+    while len(states) < count:
+        if not game.step(inputs(game, game.frame)):
+            game.reset_game(seed)
+        states.append((game.frame, capture(game)))
+    return states
+
+def test_rewind_buffer_get():
+    states = snapshots(150)
+    buffer = RewindBuffer(100, keyframe_interval=16)
+    for frame, data in states:
+        buffer.push(frame, data)
+    assert len(buffer) == 100
+    assert buffer.oldest() == states[50][0]
+    for frame, data in states[50:]:
+        assert buffer.get(frame) == data
+    assert buffer.get(states[49][0]) is None
+    assert buffer.get(states[-1][0] + 1) is None
+
+def test_rewind_buffer_truncate():
+    states = snapshots(120)
+    buffer = RewindBuffer(200, keyframe_interval=16)
+    for frame, data in states[:100]:
+        buffer.push(frame, data)
+    
+    # Forget everything after frame 70 (mid keyframe interval), then push the
+    # remaining states again as a rewound game would
+    buffer.truncate(states[69][0])
+    assert len(buffer) == 70
+    assert buffer.get(states[70][0]) is None
+    for frame, data in states[70:]:
+        buffer.push(frame, data)
+    for frame, data in states:
+        assert buffer.get(frame) == data
+    
+    # Truncating onto a keyframe's frame keeps it; before it drops it
+    buffer.truncate(states[32][0])
+    buffer.truncate(states[31][0])
+    for frame, data in states[32:]:
+        buffer.push(frame, data)
+    for frame, data in states:
+        assert buffer.get(frame) == data
+    
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.oldest() is None and buffer.stats()["bytes"] == 0
+
+class Submissions:
+    # Stands in for the leaderboard, keeping what was submitted
+    high_score = 0
+    
+    def __init__(self):
+        self.runs = []
+    
+    def submit(self, *run):
+        self.runs.append(run)
+
+def test_quick_load_keeps_run_off_leaderboard():
+    game = Game(headless=True, seed=3)
+    game.leaderboard = Submissions()
+    play(game, 100, 3)
+    game.quick_save()
+    play(game, 100, 4)
+    game.quick_load()
+    assert game.assisted
+    game.leaderboard.high_score = game.high_score + 1000
+    game.record_run()
+    assert game.leaderboard.runs == []
+    assert game.high_score == game.leaderboard.high_score
+    
+    game.reset_game(3)
+    assert not game.assisted
+    game.record_run()
+    assert len(game.leaderboard.runs) == 1
@@ -0,0 +1,23 @@
+import numpy as np
+
+from sweep import build_grid, run_sweep
+from templerun_claude import Game, RandomInput
+
+GRID = build_grid({"start_speed": [8, 10]})
+
+def test_same_base_seed_gives_same_results():
+    # Small chunks on two workers, so each worker plays many runs in a row
+    first = run_sweep(GRID, 6, max_frames=3000, processes=2, chunk_size=2, base_seed=1)
+    second = run_sweep(GRID, 6, max_frames=3000, processes=2, chunk_size=2, base_seed=1)
+    assert (first == second).all()
+    assert list(first["point"]) == [0] * 6 + [1] * 6
+
+def test_recorded_seeds_replay_on_their_own():
+    results = run_sweep(GRID, 4, max_frames=3000, processes=1, chunk_size=8, base_seed=2)
+    for record in results:
+        game = Game(headless=True)
+        game.configure(GRID[record["point"]])
+        game.start_run(int(record["seed"]))
+        outcome = game.run_headless(3000, RandomInput(int(record["seed"])))
+        assert (outcome["frames"], outcome["score"]) == (record["frames"], record["score"])
+        assert np.float32(outcome["distance"]) == record["distance"]
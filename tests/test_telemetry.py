@@ -0,0 +1,117 @@
+import time
+
+import numpy as np
+import pygame
+import pytest
+
+from gametypes import OBSTACLE_TYPES, COLLECTIBLE_TYPES, MENU, PLAYING, GAME_OVER
+from telemetry import (Telemetry, DTYPE, EVENTS, EVENT_RUN_START, EVENT_RUN_END, EVENT_HIT, EVENT_COLLECT,
+                       EVENT_COMBO, EVENT_STATE, log_files, load, analyze, report)
+from templerun_claude import Game, RandomInput
+
+def read_all(directory):
+    files = log_files([str(directory)])
+    return np.concatenate([load(path) for path in files]) if files else np.zeros(0, dtype=DTYPE)
+
+def test_log_round_trip(tmp_path):
+    # Small buffers and files, so records cross buffer and file boundaries
+    log = Telemetry(str(tmp_path), buffer_records=7, rotate_bytes=10 * DTYPE.itemsize)
+    expected = []
+    for i in range(100):
+        log.begin_run()
+        row = (i % len(EVENTS), i, i % 4, i % 3, i % 4, i * 10.5, i * 3, i * 7)
+        log.log(*row)
+        expected.append(row)
+    log.close()
+    
+    assert log.stats()["records"] == 100 and log.stats()["dropped"] == 0
+    assert len(log_files([str(tmp_path)])) > 1
+    records = read_all(tmp_path)
+    assert len(records) == 100
+    assert (records["session"] == log.session).all()
+    assert list(records["run"]) == list(range(1, 101))
+    for record, (event, frame, subject, lane, lives, distance, value, score) in zip(records, expected):
+        assert (record["event"], record["frame"], record["subject"], record["lane"], record["lives"],
+                record["distance"], record["value"], record["score"]) == (
+                event, frame, subject, lane, lives, distance, value, score)
+
+def test_truncated_file_is_read_up_to_the_last_whole_record(tmp_path):
+    log = Telemetry(str(tmp_path))
+    for frame in range(5):
+        log.log(EVENT_COMBO, frame, 0, 1, 3, 0.0, frame + 1, 0)
+    log.close()
+    path, = log_files([str(tmp_path)])
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    assert len(load(path)) == 5
+    assert report(analyze([str(tmp_path)]))["combos"]["count"] == 5
+
+def test_full_buffers_drop_instead_of_blocking(tmp_path):
+    log = Telemetry(str(tmp_path), buffer_records=4, max_buffers=1)
+    log.pending.put(None)  # Writer stops, so nothing is ever handed back
+    log.thread.join()
+    for frame in range(10):
+        log.log(EVENT_COMBO, frame, 0, 1, 3, 0.0, 1, 0)
+    assert log.dropped == 6
+
+def test_tick_flushes_a_quiet_buffer(tmp_path):
+    log = Telemetry(str(tmp_path), flush_interval=0.05)
+    log.deadline = time.perf_counter() + log.flush_interval
+    log.log(EVENT_COMBO, 1, 0, 1, 3, 0.0, 1, 0)
+    log.tick()
+    assert log.used
+    time.sleep(log.flush_interval)
+    log.tick()
+    assert not log.used
+    for _ in range(100):
+        if log.written:
+            break
+        time.sleep(0.01)
+    assert len(read_all(tmp_path)) == 1
+    log.close()
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_analyzer_matches_the_game(seed, tmp_path):
+    game = Game(headless=True, seed=seed, telemetry_dir=str(tmp_path))
+    game.run_headless(20000, RandomInput(seed))
+    game.telemetry.close()
+    assert game.state == GAME_OVER
+    
+    summary = report(analyze([str(tmp_path)]))
+    assert summary["runs"] == dict(summary["runs"], started=1, finished=1, mean_frames=float(game.frame),
+                                   mean_score=float(game.score))
+    assert summary["runs"]["ended_by"]["game_over"] == 1
+    assert summary["deaths"]["by_obstacle"][game.death_cause] == 1
+    assert summary["deaths"]["total"] == 1
+    assert sum(summary["hits"].values()) == 3
+    points = sum(summary["points"].values())
+    assert points == game.coins
+    
+    records = read_all(tmp_path)
+    assert records["event"][0] == EVENT_RUN_START and records["value"][0] == seed
+    assert records["event"][-1] == EVENT_RUN_END
+    fatal = records[(records["event"] == EVENT_HIT) & (records["lives"] == 0)]
+    assert OBSTACLE_TYPES[fatal["subject"][0]] == game.death_cause
+    collected = records[records["event"] == EVENT_COLLECT]
+    assert all(COLLECTIBLE_TYPES[subject] in ("coin", "gem") or value == 0
+               for subject, value in zip(collected["subject"], collected["value"]))
+
+def test_start_is_logged_in_the_new_run(tmp_path):
+    game = Game(leaderboard_path=None, telemetry_dir=str(tmp_path))
+    try:
+        for _ in range(2):
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE, mod=0, unicode=" ", scancode=0))
+            game.handle_events()
+            assert game.state == PLAYING
+            game.step()
+            game.state = GAME_OVER
+        game.telemetry.close()
+    finally:
+        pygame.quit()
+    
+    records = read_all(tmp_path)
+    starts = records[records["event"] == EVENT_RUN_START]
+    states = records[records["event"] == EVENT_STATE]
+    assert list(states["value"]) == [MENU, GAME_OVER] and list(states["subject"]) == [PLAYING, PLAYING]
+    assert list(states["run"]) == list(starts["run"]) == [1, 2]
+    assert list(states["frame"]) == [0, 0]
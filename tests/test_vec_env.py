@@ -0,0 +1,26 @@
+import numpy as np
+
+from vec_env import VecRunnerEnv, OBSERVATION_SIZE
+
+def test_reset_is_reproducible():
+    env = VecRunnerEnv(3)
+    first = env.reset(seed=7)
+    assert first.shape == (3, OBSERVATION_SIZE)
+    assert (env.reset(seed=7) == first).all()
+
+def test_finished_games_play_new_episodes():
+    # Every episode after the first must be a real run too, not a game left
+    # over that reports done again straight away
+    env = VecRunnerEnv(4)
+    env.reset(seed=1)
+    rng = np.random.default_rng(1)
+    episodes = [[] for _ in range(env.num_envs)]
+    for _ in range(4000):
+        _, _, dones, infos = env.step(env.sample_actions(rng))
+        for i in np.flatnonzero(dones):
+            episodes[i].append(infos[i])
+    for finished in episodes:
+        assert len(finished) >= 2
+        for info in finished:
+            assert info["frames"] > 100 and info["score"] > 0
+    assert sum(len(finished) for finished in episodes) < 4000 * env.num_envs / 100
@@ -0,0 +1,139 @@
+import random
+
+import numpy as np
+
+from templerun_claude import (Game, GAME_OVER, ACTIONS, SCREEN_WIDTH, SCREEN_HEIGHT)
+from gametypes import OBSTACLE_TYPES, COLLECTIBLE_TYPES, POWERUPS
+
+# Discrete actions: 0 is a no-op, the rest follow ACTIONS (jump, slide, left, right)
+NUM_ACTIONS = len(ACTIONS) + 1
+
+# Observation type ids are 1-based so that 0 can mark an empty slot
+OBSTACLE_TYPE_IDS = {name: i + 1 for i, name in enumerate(OBSTACLE_TYPES)}
+COLLECTIBLE_TYPE_IDS = {name: i + 1 for i, name in enumerate(COLLECTIBLE_TYPES)}
+
+# Observation layout (float32, positions normalised by the screen size):
+#   player: lane, x, y, velocity_y, jumping, sliding, moving, invincible, game_speed
+#   power-up timers in seconds, in POWERUPS order
+#   nearest MAX_OBSTACLES obstacles ahead: dx, top, width, height, type id (0 = empty)
+#   nearest MAX_COLLECTIBLES collectibles ahead: dx, dy, type id (0 = empty)
+PLAYER_FEATURES = 9
+OBSTACLE_FEATURES = 5
+COLLECTIBLE_FEATURES = 3
+MAX_OBSTACLES = 6
+MAX_COLLECTIBLES = 6
+OBSERVATION_SIZE = (PLAYER_FEATURES + len(POWERUPS) + MAX_OBSTACLES * OBSTACLE_FEATURES
+                    + MAX_COLLECTIBLES * COLLECTIBLE_FEATURES)
+
+LIFE_PENALTY = 100.0  # Reward lost per life, on top of the score change
+
+class VecRunnerEnv:
+    # Steps num_envs independent headless games in lockstep. Finished games
+    # are reset automatically with a fresh seed; their last stats are reported
+    # in that step's info dict.
+    def __init__(self, num_envs, frame_skip=1):
+        self.num_envs = num_envs
+        self.frame_skip = frame_skip
+        self.games = [Game(headless=True) for _ in range(num_envs)]
+        self.seed_rng = random.Random()
+        self.observation_size = OBSERVATION_SIZE
+        self.num_actions = NUM_ACTIONS
+        
+        # Store type ids -> observation type ids
+        self.obstacle_codes = np.array([OBSTACLE_TYPE_IDS[name] for name in self.games[0].obstacles.type_names])
+        self.collectible_codes = np.array([COLLECTIBLE_TYPE_IDS[name] for name in self.games[0].collectibles.type_names])
+        
+        self.observations = np.zeros((num_envs, OBSERVATION_SIZE), dtype=np.float32)
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.dones = np.zeros(num_envs, dtype=bool)
+    
+    def reset(self, seed=None):
+        # Each game gets its own seed derived from seed, so a batch is reproducible
+        self.seed_rng.seed(seed)
+        for i, game in enumerate(self.games):
+            game.start_run(self.seed_rng.getrandbits(32))
+            self.observe(i, game)
+        return self.observations.copy()
+    
+    def step(self, actions):
+        actions = np.asarray(actions)
+        infos = [{} for _ in range(self.num_envs)]
+        rewards = self.rewards
+        dones = self.dones
+        
+        for i, game in enumerate(self.games):
+            score = game.score
+            lives = game.lives
+            
+            action = int(actions[i])
+            step_actions = (ACTIONS[action - 1],) if action else ()
+            for _ in range(self.frame_skip):
+                if not game.step(step_actions):
+                    break
+                step_actions = ()
+            
+            rewards[i] = (game.score - score) - LIFE_PENALTY * (lives - game.lives)
+            dones[i] = game.state == GAME_OVER
+            if dones[i]:
+                infos[i] = {
+                    "score": game.score,
+                    "distance": game.distance,
+                    "coins": game.coins,
+                    "frames": game.frame,
+                    "seed": game.seed
+                }
+                game.start_run(self.seed_rng.getrandbits(32))
+            self.observe(i, game)
+        
+        return self.observations.copy(), rewards.copy(), dones.copy(), infos
+    
+    def observe(self, i, game):
+        row = self.observations[i]
+        row[:] = 0.0
+        player = game.player
+        
+        row[0] = player.lane
+        row[1] = player.x / SCREEN_WIDTH
+        row[2] = player.y / SCREEN_HEIGHT
+        row[3] = player.velocity_y
+        row[4] = player.is_jumping
+        row[5] = player.is_sliding
+        row[6] = player.moving
+        row[7] = player.invincible
+        row[8] = game.game_speed
+        
+        offset = PLAYER_FEATURES
+        for powerup in POWERUPS:
+            row[offset] = game.powerups[powerup] / 60.0
+            offset += 1
+        
+        # Only entities the player has not fully passed, nearest first
+        left = player.x - player.width // 2
+        obstacles = game.obstacles
+        ahead = self.nearest_ahead(obstacles, left, MAX_OBSTACLES)
+        block = row[offset:offset + MAX_OBSTACLES * OBSTACLE_FEATURES].reshape(MAX_OBSTACLES, OBSTACLE_FEATURES)
+        count = len(ahead)
+        block[:count, 0] = (obstacles.x[ahead] - player.x) / SCREEN_WIDTH
+        block[:count, 1] = (obstacles.y[ahead] - obstacles.height[ahead]) / SCREEN_HEIGHT
+        block[:count, 2] = obstacles.width[ahead] / SCREEN_WIDTH
+        block[:count, 3] = obstacles.height[ahead] / SCREEN_HEIGHT
+        block[:count, 4] = self.obstacle_codes[obstacles.type[ahead]]
+        offset += MAX_OBSTACLES * OBSTACLE_FEATURES
+        
+        collectibles = game.collectibles
+        ahead = self.nearest_ahead(collectibles, left, MAX_COLLECTIBLES)
+        block = row[offset:offset + MAX_COLLECTIBLES * COLLECTIBLE_FEATURES].reshape(MAX_COLLECTIBLES, COLLECTIBLE_FEATURES)
+        count = len(ahead)
+        block[:count, 0] = (collectibles.x[ahead] - player.x) / SCREEN_WIDTH
+        block[:count, 1] = (collectibles.y[ahead] - player.y) / SCREEN_HEIGHT
+        block[:count, 2] = self.collectible_codes[collectibles.type[ahead]]
+    
+    def nearest_ahead(self, store, left, limit):
+        # Indices of the first limit entities whose right edge is past left, by x
+        x = store.x[:store.count]
+        ahead = (x + store.width[:store.count] > left).nonzero()[0]
+        return ahead[np.argsort(x[ahead], kind="stable")[:limit]]
+    
+    def sample_actions(self, rng=None):
+        rng = rng or np.random.default_rng()
+        return rng.integers(0, NUM_ACTIONS, self.num_envs)